@@ -15,6 +15,19 @@ uv run python manage.py collectstatic --noinput
 echo "Applying database migrations..."
 uv run python manage.py migrate --noinput
 
+# Метрики прошлого запуска не должны попасть в счетчики нового
+if [ -n "$PROMETHEUS_MULTIPROC_DIR" ]; then
+  rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+  mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+fi
+
 # Запускаем сервер
 echo "Starting server..."
-uv run gunicorn core.wsgi:application --bind 0.0.0.0:8000 --workers 4 
\ No newline at end of file
+if [ "${ASYNC_READ_VIEWS,,}" = "true" ]; then
+  uv run gunicorn core.asgi:application --bind 0.0.0.0:8000 --workers 4 \
+    --worker-class uvicorn_worker.UvicornWorker
+else
+  # Потоки позволяют обслуживать чтение, пока вход ждет пула хэширования
+  uv run gunicorn core.wsgi:application --bind 0.0.0.0:8000 --workers 4 \
+    --threads 4
+fi
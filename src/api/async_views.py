@@ -0,0 +1,158 @@
+from abc import ABC, abstractmethod
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.http import Http404, HttpResponse
+from django.shortcuts import aget_object_or_404
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .authentication import CachedJWTAuthentication
+from .caches import aget_user_detail, aset_user_detail
+from .conditional import etag_matches, user_detail_etag, user_list_etag
+from .fieldsets import parse_fieldset, trim
+from .filters import UserFilterBackend
+from .pagination import IdCursorPagination
+from .serializers import UserDetailSerializer, UserListSerializer
+from .views import user_detail_queryset, user_list_queryset
+
+User = get_user_model()
+
+
+class AsyncReadView(ABC, View):
+    """
+    Асинхронный аналог DRF-представления только для чтения:
+    JWT-аутентификация и запросы к БД выполняются через async ORM.
+    """
+
+    http_method_names = ["get", "head"]
+    authentication = CachedJWTAuthentication()
+    renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+
+    async def get(self, request, *args, **kwargs):
+        request = Request(request)
+        try:
+            user_auth = await self.authentication.aauthenticate(request)
+            if user_auth is None:
+                raise exceptions.NotAuthenticated()
+            request.user, request.auth = user_auth
+            return await self.read(request, *args, **kwargs)
+        except Http404 as exc:
+            # Как в rest_framework.views.exception_handler
+            return self.error_response(exceptions.NotFound(*exc.args))
+        except exceptions.APIException as exc:
+            return self.error_response(exc)
+
+    @abstractmethod
+    async def read(self, request, *args, **kwargs):
+        pass
+
+    def render(self, data, headers=None):
+        response = HttpResponse(
+            self.renderer.render(data),
+            content_type="application/json",
+            headers=headers,
+        )
+        response["Vary"] = "Accept"
+        return response
+
+    def not_modified(self, etag):
+        return HttpResponse(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    def error_response(self, exc):
+        if isinstance(exc.detail, (list, dict)):
+            data = exc.detail
+        else:
+            data = {"detail": exc.detail}
+        response = self.render(data)
+        response.status_code = exc.status_code
+        if isinstance(
+            exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)
+        ):
+            response.status_code = status.HTTP_401_UNAUTHORIZED
+            response["WWW-Authenticate"] = self.authentication.authenticate_header(None)
+        return response
+
+
+class AsyncUserListView(AsyncReadView):
+    async def read(self, request):
+        fieldset = parse_fieldset(request.query_params, UserListSerializer.Meta.fields)
+        queryset = UserFilterBackend().filter_queryset(
+            request, user_list_queryset(fieldset), self
+        )
+        if request.query_params.get("pagination") == "cursor":
+            paginator = IdCursorPagination()
+            users = await sync_to_async(paginator.paginate_queryset)(queryset, request)
+        else:
+            paginator = LimitOffsetPagination()
+            paginator.request = request
+            paginator.limit = paginator.get_limit(request)
+            paginator.offset = paginator.get_offset(request)
+            paginator.count = await queryset.acount()
+            users = [
+                user
+                async for user in queryset[
+                    paginator.offset : paginator.offset + paginator.limit
+                ]
+            ]
+
+        etag = user_list_etag(users, getattr(paginator, "count", None))
+        if etag_matches(request, etag):
+            return self.not_modified(etag)
+
+        data = UserListSerializer(users, many=True, context={"fieldset": fieldset}).data
+        response = paginator.get_paginated_response(data)
+        return self.render(response.data, headers={"ETag": etag})
+
+
+class AsyncUserDetailView(AsyncReadView):
+    async def read(self, request, pk):
+        fieldset = parse_fieldset(
+            request.query_params, UserDetailSerializer.Meta.fields
+        )
+        cached = await aget_user_detail(pk)
+        if cached is None and "If-None-Match" in request.headers:
+            version = await (
+                User.objects.filter(pk=pk).values_list("version", flat=True).afirst()
+            )
+            if version is not None and etag_matches(
+                request, user_detail_etag(pk, version)
+            ):
+                return self.not_modified(user_detail_etag(pk, version))
+
+        if cached is None:
+            user = await aget_object_or_404(user_detail_queryset(fieldset), pk=pk)
+            etag = user_detail_etag(user.pk, user.version)
+            data = UserDetailSerializer(user, context={"fieldset": fieldset}).data
+            if fieldset is not None:
+                # В кэше хранится только полное представление
+                return self.render(data, headers={"ETag": etag})
+            cached = {"etag": etag, "data": data}
+            await aset_user_detail(user.pk, **cached)
+
+        if etag_matches(request, cached["etag"]):
+            return self.not_modified(cached["etag"])
+        return self.render(
+            trim(cached["data"], fieldset), headers={"ETag": cached["etag"]}
+        )
+
+
+def read_async(async_view, sync_view):
+    """
+    Отдает GET/HEAD асинхронному представлению, остальные методы
+    выполняет синхронное DRF-представление в пуле потоков.
+    """
+    sync_view_async = sync_to_async(sync_view)
+
+    @wraps(sync_view)
+    async def view(request, *args, **kwargs):
+        if request.method in ("GET", "HEAD"):
+            return await async_view(request, *args, **kwargs)
+        return await sync_view_async(request, *args, **kwargs)
+
+    view.csrf_exempt = True
+    return view
@@ -0,0 +1,94 @@
+import copy
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .caches import TTLLRUCache
+from .replicas import astick_after_write, stick_after_write
+
+user_cache = TTLLRUCache(
+    maxsize=settings.AUTH_USER_CACHE_SIZE,
+    ttl=settings.AUTH_USER_CACHE_TTL,
+)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication, который берет пользователя из кэша процесса.
+    Кэш сбрасывается сигналами при сохранении и удалении пользователя.
+    """
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            ) from e
+
+    def check_user(self, user, validated_token):
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed"
+            )
+
+        # Копия защищает закэшированный объект от изменений внутри запроса
+        return copy.copy(user)
+
+    def get_user_queryset(self, user_id):
+        # Пользователь для проверки токена читается из основной БД: реплика
+        # может вернуть устаревшие is_active и пароль, и они попадут в кэш
+        return self.user_model.objects.using(DEFAULT_DB_ALIAS).filter(
+            **{api_settings.USER_ID_FIELD: user_id}
+        )
+
+    def get_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        stick_after_write(user_id)
+        user = user_cache.get(str(user_id))
+        if user is None:
+            try:
+                user = self.get_user_queryset(user_id).get()
+            except self.user_model.DoesNotExist as e:
+                raise AuthenticationFailed(
+                    _("User not found"), code="user_not_found"
+                ) from e
+            user_cache.set(str(user_id), user)
+        return self.check_user(user, validated_token)
+
+    async def aget_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        await astick_after_write(user_id)
+        user = user_cache.get(str(user_id))
+        if user is None:
+            try:
+                user = await self.get_user_queryset(user_id).aget()
+            except self.user_model.DoesNotExist as e:
+                raise AuthenticationFailed(
+                    _("User not found"), code="user_not_found"
+                ) from e
+            user_cache.set(str(user_id), user)
+        return self.check_user(user, validated_token)
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+
+        return await self.aget_user(validated_token), validated_token
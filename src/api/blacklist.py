@@ -0,0 +1,125 @@
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate):
+        capacity = max(capacity, 1)
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hash_count = max(round(self.size / capacity * math.log(2)), 1)
+        self.capacity = capacity
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, value):
+        for position in self._positions(value):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(value)
+        )
+
+
+class BlacklistFilter:
+    """
+    Фильтр Блума по jti заблокированных токенов в памяти воркера.
+    Отрицательный ответ точен, положительный нужно перепроверять в БД.
+    """
+
+    def __init__(self, capacity, error_rate, sync_interval, rebuild_interval):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self.rebuild_interval = rebuild_interval
+        self._bloom = None
+        self._last_id = 0
+        self._synced_at = 0.0
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+
+    def rebuild(self):
+        with self._lock:
+            self._rebuild()
+
+    def sync(self):
+        with self._lock:
+            self._sync()
+
+    def _rebuild(self):
+        rows = BlacklistedToken.objects.filter(
+            token__expires_at__gt=timezone.now()
+        ).values_list("id", "token__jti")
+        bloom = BloomFilter(self.capacity, self.error_rate)
+        last_id = 0
+        for row_id, jti in rows.iterator(chunk_size=10000):
+            bloom.add(jti)
+            last_id = max(last_id, row_id)
+        self._bloom = bloom
+        self._last_id = last_id
+        self._built_at = self._synced_at = time.monotonic()
+
+    def _sync(self):
+        rows = BlacklistedToken.objects.filter(id__gt=self._last_id).values_list(
+            "id", "token__jti"
+        )
+        for row_id, jti in rows:
+            self._bloom.add(jti)
+            self._last_id = max(self._last_id, row_id)
+        self._synced_at = time.monotonic()
+
+    def _needs_rebuild(self):
+        return (
+            self._bloom is None
+            or time.monotonic() - self._built_at > self.rebuild_interval
+            or self._bloom.count > self._bloom.capacity
+        )
+
+    def _needs_sync(self):
+        return time.monotonic() - self._synced_at > self.sync_interval
+
+    def _refresh(self):
+        # Условие перепроверяется под блокировкой: потоки, дождавшиеся ее,
+        # не повторяют обновление, которое уже выполнил первый из них.
+        if self._needs_rebuild() or self._needs_sync():
+            with self._lock:
+                if self._needs_rebuild():
+                    self._rebuild()
+                elif self._needs_sync():
+                    self._sync()
+
+    def might_contain(self, jti):
+        self._refresh()
+        return jti in self._bloom
+
+    def add(self, jti):
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(jti)
+
+    def reset(self):
+        with self._lock:
+            self._bloom = None
+
+
+blacklist_filter = BlacklistFilter(
+    capacity=settings.BLACKLIST_FILTER_CAPACITY,
+    error_rate=settings.BLACKLIST_FILTER_ERROR_RATE,
+    sync_interval=settings.BLACKLIST_FILTER_SYNC_INTERVAL,
+    rebuild_interval=settings.BLACKLIST_FILTER_REBUILD_INTERVAL,
+)
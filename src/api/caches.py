@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .replicas import reading_after_write, reading_from_replica
+
+
+class TTLLRUCache:
+    """Потокобезопасный LRU-кэш процесса с ограничением времени жизни записей."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+def user_detail_cache_key(pk):
+    return f"user-detail:{pk}"
+
+
+def user_detail_cache_ttl():
+    # Реплика могла отстать от записи, сбросившей кэш: прочитанное из нее
+    # хранится не дольше, чем автор записи читает из основной БД
+    if reading_from_replica():
+        return min(settings.USER_DETAIL_CACHE_TTL, settings.DB_REPLICA_STICKY_SECONDS)
+    return settings.USER_DETAIL_CACHE_TTL
+
+
+def get_user_detail(pk):
+    # После своей записи пользователь не должен получить данные из реплики
+    if reading_after_write():
+        return None
+    return cache.get(user_detail_cache_key(pk))
+
+
+def set_user_detail(pk, etag, data):
+    cache.set(
+        user_detail_cache_key(pk),
+        {"etag": etag, "data": data},
+        user_detail_cache_ttl(),
+    )
+
+
+async def aget_user_detail(pk):
+    if reading_after_write():
+        return None
+    return await cache.aget(user_detail_cache_key(pk))
+
+
+async def aset_user_detail(pk, etag, data):
+    await cache.aset(
+        user_detail_cache_key(pk),
+        {"etag": etag, "data": data},
+        user_detail_cache_ttl(),
+    )
+
+
+def invalidate_user_details(pks):
+    keys = [user_detail_cache_key(pk) for pk in pks]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    # Повторная очистка после коммита убирает данные, закэшированные
+    # параллельным запросом до завершения транзакции
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,52 @@
+import hashlib
+
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+class ConditionalGetMixin:
+    # Отвечает 304 Not Modified на GET с совпадающим If-None-Match,
+    # не сериализуя ответ. Проверка выполняется после аутентификации.
+    # Без docstring: drf-spectacular подставил бы его в описание операций.
+
+    def get_etag(self, request, *args, **kwargs):
+        return None
+
+    def not_modified(self, request, etag):
+        if etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        return None
+
+    def get(self, request, *args, **kwargs):
+        etag = self.get_etag(request, *args, **kwargs)
+        if etag is not None:
+            not_modified = self.not_modified(request, etag)
+            if not_modified is not None:
+                return not_modified
+
+        response = super().get(request, *args, **kwargs)
+        if (
+            etag is not None
+            and response.status_code == status.HTTP_200_OK
+            and not response.has_header("ETag")
+        ):
+            response["ETag"] = etag
+        return response
+
+
+def etag_matches(request, etag):
+    if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+    return etag in if_none_match or "*" in if_none_match
+
+
+def user_detail_etag(pk, version):
+    return quote_etag(f"user-{pk}-v{version}")
+
+
+def user_list_etag(users, count=None):
+    digest = hashlib.md5(usedforsecurity=False)
+    digest.update(str(count).encode())
+    for user in users:
+        digest.update(f"{user['id']}:{user['version']};".encode())
+    return quote_etag(f"users-{digest.hexdigest()}")
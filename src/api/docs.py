@@ -1,4 +1,26 @@
-from drf_spectacular.utils import extend_schema
+from drf_spectacular.contrib import rest_framework_simplejwt as simplejwt_docs
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+
+from .serializers import BulkMentorshipResultSerializer
+
+
+class TokenObtainPairSerializerExtension(
+    simplejwt_docs.TokenObtainPairSerializerExtension
+):
+    # Расширение drf-spectacular не распространяется на наследников
+    target_class = "api.serializers.TokenObtainPairSerializer"
+
+
+class CachedJWTScheme(simplejwt_docs.SimpleJWTScheme):
+    target_class = "api.authentication.CachedJWTAuthentication"
+
+
+fieldset_parameters = [
+    OpenApiParameter(
+        "fields", str, description="Поля ответа через запятую, остальные опускаются"
+    ),
+    OpenApiParameter("omit", str, description="Поля, исключаемые из ответа"),
+]
 
 docs_schemes = {
     "registration": extend_schema(
@@ -25,10 +47,62 @@ docs_schemes = {
         methods=["GET"],
         summary="Список пользователей",
         tags=["users"],
+        parameters=[
+            OpenApiParameter(
+                "pagination",
+                str,
+                enum=["cursor"],
+                description="Keyset-пагинация по id (параметры cursor и limit)",
+            ),
+            OpenApiParameter("cursor", str, description="Курсор страницы"),
+            *fieldset_parameters,
+        ],
     ),
     "user_detail": extend_schema(
         methods=["GET", "PUT", "PATCH"],
         summary="Просмотр и редактирование профиля",
         tags=["users"],
     ),
+    "user_detail_get": extend_schema(methods=["GET"], parameters=fieldset_parameters),
+    "user_ancestors": extend_schema(
+        methods=["GET"],
+        summary="Цепочка менторов пользователя",
+        tags=["users"],
+        parameters=[
+            OpenApiParameter("depth", int, description="Максимальная глубина"),
+        ],
+    ),
+    "user_descendants": extend_schema(
+        methods=["GET"],
+        summary="Поддерево менти пользователя",
+        tags=["users"],
+        parameters=[
+            OpenApiParameter("depth", int, description="Максимальная глубина"),
+        ],
+    ),
+    "mentorship_bulk": extend_schema(
+        methods=["POST"],
+        summary="Массовое назначение менторов",
+        tags=["users"],
+        responses=BulkMentorshipResultSerializer,
+    ),
+    "user_export": extend_schema(
+        methods=["GET"],
+        summary="Выгрузка всех пользователей (только для staff)",
+        tags=["users"],
+        parameters=[
+            OpenApiParameter(
+                "output",
+                str,
+                enum=["ndjson", "csv"],
+                description="Формат выгрузки, по умолчанию ndjson",
+            ),
+        ],
+        responses={(200, "application/x-ndjson"): str, (200, "text/csv"): str},
+    ),
+    "user_changes": extend_schema(
+        methods=["GET"],
+        summary="Пользователи, созданные или измененные после курсора",
+        tags=["users"],
+    ),
 }
@@ -0,0 +1,76 @@
+import csv
+import io
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+EXPORT_FIELDS = ("id", "username", "email", "phone_number", "mentor", "is_mentor")
+
+
+def export_rows(chunk_size):
+    """Все пользователи в порядке id, выбираются серверным курсором пачками."""
+    return (
+        User.objects.with_is_mentor()
+        .order_by("id")
+        .values_list(
+            "id", "username", "email", "phone_number", "mentor__username", "has_mentees"
+        )
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def buffered(lines, buffer_size):
+    """Склеивает строки в блоки ~buffer_size символов, чтобы не писать по строке."""
+    buffer = []
+    size = 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= buffer_size:
+            yield "".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer)
+
+
+async def async_blocks(blocks):
+    """
+    Блоки выгрузки для ASGI. Синхронный итератор ASGI-обработчик Django
+    собирает в список целиком, здесь же каждый блок читается отдельным
+    вызовом в потоке запроса, где открыт серверный курсор.
+    """
+    blocks = iter(blocks)
+    while (block := await sync_to_async(next)(blocks, None)) is not None:
+        yield block
+
+
+def ndjson_lines(rows):
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    for row in rows:
+        yield encoder.encode(dict(zip(EXPORT_FIELDS, row))) + "\n"
+
+
+def csv_lines(rows):
+    output = io.StringIO()
+    writer = csv.writer(output)
+
+    def line(values):
+        writer.writerow(values)
+        value = output.getvalue()
+        output.seek(0)
+        output.truncate()
+        return value
+
+    yield line(EXPORT_FIELDS)
+    for row in rows:
+        yield line(row)
+
+
+EXPORT_FORMATS = {
+    "ndjson": (ndjson_lines, "application/x-ndjson"),
+    "csv": (csv_lines, "text/csv"),
+}
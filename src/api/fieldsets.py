@@ -0,0 +1,64 @@
+from rest_framework.exceptions import ValidationError
+
+
+def parse_fieldset(query_params, available):
+    """
+    Поля ответа из ?fields= (оставить только их) или ?omit= (исключить).
+    Возвращает None, если параметры не переданы, иначе кортеж полей
+    в порядке сериализатора.
+    """
+    fields = query_params.get("fields")
+    omit = query_params.get("omit")
+    if fields is None and omit is None:
+        return None
+    if fields is not None and omit is not None:
+        raise ValidationError("Параметры fields и omit нельзя передавать вместе")
+
+    param, value = ("fields", fields) if fields is not None else ("omit", omit)
+    names = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = names - set(available)
+    if unknown:
+        raise ValidationError(
+            {param: f"Неизвестные поля: {', '.join(sorted(unknown))}"}
+        )
+    if param == "fields":
+        return tuple(name for name in available if name in names)
+    return tuple(name for name in available if name not in names)
+
+
+def trim(data, fieldset):
+    if fieldset is None:
+        return data
+    return {name: value for name, value in data.items() if name in fieldset}
+
+
+class SparseFieldsetSerializerMixin:
+    # Убирает из сериализатора поля, не вошедшие в context["fieldset"]
+    # (без docstring: он попал бы в описание схем сериализаторов)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fieldset = self.context.get("fieldset")
+        if fieldset is None:
+            return fields
+        return {name: field for name, field in fields.items() if name in fieldset}
+
+    def representation_key(self):
+        return self.context.get("fieldset")
+
+
+class SparseFieldsetMixin:
+    """Разбирает ?fields= / ?omit= для полей сериализатора представления."""
+
+    def get_fieldset(self):
+        if not hasattr(self, "_fieldset"):
+            self._fieldset = None
+            if self.request is not None and self.request.method == "GET":
+                self._fieldset = parse_fieldset(
+                    self.request.query_params,
+                    self.get_serializer_class().Meta.fields,
+                )
+        return self._fieldset
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), "fieldset": self.get_fieldset()}
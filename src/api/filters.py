@@ -0,0 +1,90 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.functions import Lower
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+User = get_user_model()
+
+TRUE_VALUES = {"true", "1"}
+FALSE_VALUES = {"false", "0"}
+
+
+class UserFilterBackend(BaseFilterBackend):
+    """
+    Фильтры списка пользователей. Каждый фильтр рассчитан на индекс
+    из миграции 0004_user_filter_indexes.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+
+        search = params.get("search", "").strip().lower()
+        if search:
+            # lower(...) LIKE 'prefix%' использует функциональные индексы
+            queryset = queryset.alias(
+                username_lower=Lower("username"), email_lower=Lower("email")
+            ).filter(
+                Q(username_lower__startswith=search) | Q(email_lower__startswith=search)
+            )
+
+        mentor = params.get("mentor")
+        if mentor is not None:
+            try:
+                mentor = int(mentor)
+            except ValueError:
+                raise ValidationError({"mentor": "Ожидается id пользователя"})
+            queryset = queryset.filter(mentor_id=mentor)
+
+        is_mentor = self.get_bool(params, "is_mentor")
+        if is_mentor is not None:
+            has_mentees = Exists(User.objects.filter(mentor=OuterRef("pk")))
+            queryset = queryset.filter(has_mentees if is_mentor else ~has_mentees)
+
+        has_mentor = self.get_bool(params, "has_mentor")
+        if has_mentor is not None:
+            queryset = queryset.filter(mentor__isnull=not has_mentor)
+
+        return queryset
+
+    def get_bool(self, params, name):
+        value = params.get(name)
+        if value is None:
+            return None
+        if value.lower() in TRUE_VALUES:
+            return True
+        if value.lower() in FALSE_VALUES:
+            return False
+        raise ValidationError({name: "Ожидается true или false"})
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": "search",
+                "required": False,
+                "in": "query",
+                "description": "Начало username или email без учета регистра",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": "mentor",
+                "required": False,
+                "in": "query",
+                "description": "id ментора",
+                "schema": {"type": "integer"},
+            },
+            {
+                "name": "is_mentor",
+                "required": False,
+                "in": "query",
+                "description": "Есть ли у пользователя менти",
+                "schema": {"type": "boolean"},
+            },
+            {
+                "name": "has_mentor",
+                "required": False,
+                "in": "query",
+                "description": "Есть ли у пользователя ментор",
+                "schema": {"type": "boolean"},
+            },
+        ]
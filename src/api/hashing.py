@@ -0,0 +1,110 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """
+    PBKDF2 с числом итераций из настроек. Хэши с другим числом итераций
+    пересчитываются при следующем успешном входе.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASH_ITERATIONS or super().iterations
+
+
+class HashingUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Сервер перегружен, повторите попытку позже"
+    default_code = "hashing_unavailable"
+    # Отдается обработчиком исключений DRF в заголовке Retry-After
+    wait = 1
+
+
+def _init_worker():
+    django.setup()
+
+
+def _verify(password, encoded):
+    # Django сам решает, нужен ли пересчет хэша, и сообщает об этом через setter
+    updated = []
+    valid = hashers.check_password(password, encoded, setter=updated.append)
+    return valid, bool(updated)
+
+
+class HashingPool:
+    """
+    Выполняет хэширование паролей в пуле процессов. Число одновременных
+    задач (выполняемых и ожидающих) ограничено queue_size: при переполнении
+    запрос сразу получает 503 вместо того, чтобы занимать воркер.
+    """
+
+    def __init__(self, workers, queue_size, timeout=0.0):
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def executor(self):
+        # Пул создается лениво в каждом воркере gunicorn после fork
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("forkserver"),
+                    initializer=_init_worker,
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def run(self, fn, *args):
+        if self.timeout:
+            acquired = self._slots.acquire(timeout=self.timeout)
+        else:
+            acquired = self._slots.acquire(blocking=False)
+        if not acquired:
+            raise HashingUnavailable()
+        try:
+            if not self.workers:
+                return fn(*args)
+            executor = self.executor()
+            try:
+                return executor.submit(fn, *args).result()
+            except BrokenProcessPool:
+                with self._lock:
+                    if self._executor is executor:
+                        self._executor = None
+                raise HashingUnavailable()
+        finally:
+            self._slots.release()
+
+
+hashing_pool = HashingPool(
+    settings.PASSWORD_HASH_WORKERS,
+    settings.PASSWORD_HASH_QUEUE_SIZE,
+    settings.PASSWORD_HASH_QUEUE_TIMEOUT,
+)
+
+
+def make_password(password):
+    return hashing_pool.run(hashers.make_password, password)
+
+
+def verify_password(password, encoded):
+    """
+    Возвращает (пароль верен, хэш нужно пересчитать). Непригодный хэш тоже
+    проверяется в пуле: check_password тратит на него время настоящей
+    проверки, и такие учетные записи не отличить по времени ответа.
+    """
+    return hashing_pool.run(_verify, password, encoded)
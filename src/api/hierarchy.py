@@ -0,0 +1,127 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+
+User = get_user_model()
+
+
+def _table():
+    return connection.ops.quote_name(User._meta.db_table)
+
+
+def ancestors(user_id, depth, limit, offset=0):
+    """Цепочка менторов пользователя, начиная с ближайшего."""
+    table = _table()
+    return User.objects.raw(
+        f"""
+        WITH RECURSIVE chain(id, depth) AS (
+            SELECT mentor_id, 1 FROM {table}
+            WHERE id = %s AND mentor_id IS NOT NULL
+            UNION ALL
+            SELECT u.mentor_id, chain.depth + 1 FROM {table} u
+            JOIN chain ON u.id = chain.id
+            WHERE u.mentor_id IS NOT NULL AND chain.depth < %s
+        )
+        SELECT u.id, u.username, u.mentor_id, chain.depth FROM chain
+        JOIN {table} u ON u.id = chain.id
+        ORDER BY chain.depth
+        LIMIT %s OFFSET %s
+        """,
+        [user_id, depth, limit, offset],
+    )
+
+
+def descendants(user_id, depth, limit, offset=0):
+    """Поддерево менти пользователя в порядке обхода в ширину."""
+    table = _table()
+    return User.objects.raw(
+        f"""
+        WITH RECURSIVE tree(id, depth) AS (
+            SELECT id, 1 FROM {table} WHERE mentor_id = %s
+            UNION ALL
+            SELECT u.id, tree.depth + 1 FROM {table} u
+            JOIN tree ON u.mentor_id = tree.id
+            WHERE tree.depth < %s
+        )
+        SELECT u.id, u.username, u.mentor_id, tree.depth FROM tree
+        JOIN {table} u ON u.id = tree.id
+        ORDER BY tree.depth, u.id
+        LIMIT %s OFFSET %s
+        """,
+        [user_id, depth, limit, offset],
+    )
+
+
+def creates_cycle(mentor_id, mentee_ids):
+    """
+    Проверяет, замкнет ли назначение mentor_id ментором для mentee_ids цикл:
+    цикл возникает, если кто-то из менти сам является ментором или его предком.
+    UNION вместо UNION ALL завершает рекурсию и на уже испорченных данных.
+    """
+    mentee_ids = list(mentee_ids)
+    if not mentee_ids:
+        return False
+    table = _table()
+    placeholders = ", ".join(["%s"] * len(mentee_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH RECURSIVE chain(id) AS (
+                SELECT CAST(%s AS BIGINT)
+                UNION
+                SELECT u.mentor_id FROM {table} u
+                JOIN chain ON u.id = chain.id
+                WHERE u.mentor_id IS NOT NULL
+            )
+            SELECT 1 FROM chain WHERE id IN ({placeholders}) LIMIT 1
+            """,
+            [mentor_id, *mentee_ids],
+        )
+        return cursor.fetchone() is not None
+
+
+def users_in_cycles(user_ids):
+    """Возвращает тех из user_ids, кто по цепочке менторов приходит к себе."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return set()
+    table = _table()
+    placeholders = ", ".join(["%s"] * len(user_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH RECURSIVE walk(start_id, id) AS (
+                SELECT id, mentor_id FROM {table}
+                WHERE id IN ({placeholders}) AND mentor_id IS NOT NULL
+                UNION
+                SELECT walk.start_id, u.mentor_id FROM {table} u
+                JOIN walk ON u.id = walk.id
+                WHERE u.mentor_id IS NOT NULL
+            )
+            SELECT DISTINCT start_id FROM walk WHERE id = start_id
+            """,
+            user_ids,
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+
+def set_mentors(assignments, batch_size=1000):
+    """
+    Назначает менторов одним UPDATE на пачку пар (user_id, mentor_id).
+    Версия и время изменения не трогаются: их обновляет вызывающий код,
+    когда назначения окончательно приняты.
+    """
+    assignments = list(assignments)
+    table = _table()
+    with connection.cursor() as cursor:
+        for start in range(0, len(assignments), batch_size):
+            batch = assignments[start : start + batch_size]
+            rows = ", ".join(["(CAST(%s AS BIGINT), CAST(%s AS BIGINT))"] * len(batch))
+            cursor.execute(
+                f"""
+                WITH v(id, mentor_id) AS (VALUES {rows})
+                UPDATE {table}
+                SET mentor_id = v.mentor_id
+                FROM v WHERE {table}.id = v.id
+                """,
+                [value for pair in batch for value in pair],
+            )
@@ -0,0 +1,238 @@
+import csv
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.db import connection, transaction
+
+from .hierarchy import set_mentors, users_in_cycles
+
+User = get_user_model()
+
+IMPORT_FIELDS = ("username", "email", "first_name", "last_name")
+
+
+@dataclass
+class ImportResult:
+    read: int = 0
+    created: int = 0
+    skipped: int = 0
+    linked: int = 0
+    batches: int = 0
+    errors: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def rate(self):
+        return self.created / self.elapsed if self.elapsed else 0.0
+
+
+def read_records(stream, file_format):
+    """Записи пользователей из CSV (с заголовком) или NDJSON."""
+    if file_format == "csv":
+        for row in csv.DictReader(stream):
+            yield {key: value or None for key, value in row.items()}
+    else:
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _init_worker():
+    # При запуске через forkserver/spawn Django в дочернем процессе не настроен
+    django.setup()
+
+
+def hash_passwords(passwords, pool=None, workers=1):
+    """
+    Хэширует пароли, None превращается в непригодный пароль.
+    С пулом процессов PBKDF2 считается на всех ядрах.
+    """
+    if pool is None:
+        return [make_password(password) for password in passwords]
+    chunksize = max(1, len(passwords) // (workers * 4))
+    return list(pool.map(make_password, passwords, chunksize=chunksize))
+
+
+def insert_users(users):
+    """Вставляет пользователей через COPY на PostgreSQL, иначе bulk_create."""
+    if connection.vendor != "postgresql":
+        User.objects.bulk_create(users)
+        return
+
+    fields = [f for f in User._meta.concrete_fields if not f.primary_key]
+    buffer = io.StringIO()
+    # NULL в формате csv передается пустым значением без кавычек
+    writer = csv.writer(buffer, quoting=csv.QUOTE_NOTNULL)
+    for user in users:
+        writer.writerow(
+            [f.get_db_prep_save(f.pre_save(user, add=True), connection) for f in fields]
+        )
+    columns = ", ".join(connection.ops.quote_name(f.column) for f in fields)
+    table = connection.ops.quote_name(User._meta.db_table)
+    with (
+        connection.cursor() as cursor,
+        cursor.copy(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)") as copy,
+    ):
+        copy.write(buffer.getvalue())
+
+
+def link_mentors(pairs, batch_size, result):
+    """
+    Второй проход: назначает менторов по username пачками через UPDATE ... FROM.
+    Назначения, замыкающие цикл, откатываются к прежнему ментору и попадают
+    в ошибки.
+    """
+    pairs = iter(pairs)
+    while batch := list(islice(pairs, batch_size)):
+        usernames = {name for pair in batch for name in pair}
+        with transaction.atomic():
+            users = {
+                user.username: user
+                for user in User.objects.select_for_update()
+                .filter(username__in=usernames)
+                .only("id", "username", "mentor_id")
+            }
+            changed = {}
+            previous = {}
+            for mentee_name, mentor_name in batch:
+                mentee = users.get(mentee_name)
+                mentor = users.get(mentor_name)
+                if mentee is None:
+                    # Не создан из-за ошибки, уже учтенной при вставке
+                    continue
+                if mentor is None:
+                    error = "Ментор не найден"
+                elif mentor.pk == mentee.pk:
+                    error = "Пользователь не может быть своим ментором"
+                else:
+                    error = None
+                if error:
+                    result.errors.append({"username": mentee_name, "error": error})
+                    continue
+                if mentee.mentor_id != mentor.pk:
+                    previous[mentee.pk] = mentee.mentor_id
+                    changed[mentee.pk] = mentee
+                    mentee.mentor_id = mentor.pk
+            set_mentors((pk, mentee.mentor_id) for pk, mentee in changed.items())
+
+            # Откат может замкнуть новый цикл, поэтому проверка повторяется
+            cyclic = users_in_cycles(changed)
+            while cyclic:
+                reverted = [changed.pop(pk) for pk in cyclic]
+                for mentee in reverted:
+                    result.errors.append(
+                        {
+                            "username": mentee.username,
+                            "error": "Назначение создает цикл наставничества",
+                        }
+                    )
+                set_mentors((mentee.pk, previous[mentee.pk]) for mentee in reverted)
+                cyclic = users_in_cycles(changed)
+
+            # Версия и время изменения меняются только у оставшихся
+            # назначений, их прежних и новых менторов
+            mentors = {previous[pk] for pk in changed}
+            mentors |= {mentee.mentor_id for mentee in changed.values()}
+            User.objects.touch_ids(changed.keys() | mentors)
+        result.linked += len(changed)
+
+
+def import_users(records, batch_size=5000, workers=None, progress=None):
+    """
+    Импортирует пользователей пачками, каждая в своей транзакции.
+
+    Уже существующие username пропускаются, поэтому после сбоя импорт
+    можно просто запустить повторно: он продолжится с первой
+    незаписанной пачки, а проход по менторам идемпотентен.
+    """
+    result = ImportResult()
+    started = time.monotonic()
+    mentor_pairs = []
+    seen = set()
+    records = iter(records)
+    workers = os.cpu_count() if workers is None else workers
+    pool = (
+        ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        if workers > 1
+        else None
+    )
+
+    try:
+        while batch := list(islice(records, batch_size)):
+            result.read += len(batch)
+            valid = []
+            for record in batch:
+                username = record.get("username")
+                if not username:
+                    result.errors.append({"username": None, "error": "Нет username"})
+                elif username in seen:
+                    result.errors.append(
+                        {"username": username, "error": "Повторяется в файле"}
+                    )
+                else:
+                    seen.add(username)
+                    valid.append(record)
+                    if record.get("mentor"):
+                        mentor_pairs.append((username, record["mentor"]))
+
+            existing = set(
+                User.objects.filter(
+                    username__in=[record["username"] for record in valid]
+                ).values_list("username", flat=True)
+            )
+            result.skipped += len(existing)
+            new = []
+            for record in valid:
+                if record["username"] in existing:
+                    continue
+                password_hash = record.get("password_hash")
+                if password_hash:
+                    try:
+                        identify_hasher(password_hash)
+                    except ValueError:
+                        result.errors.append(
+                            {
+                                "username": record["username"],
+                                "error": "Неизвестный формат хэша пароля",
+                            }
+                        )
+                        continue
+                new.append(record)
+
+            to_hash = [
+                record.get("password")
+                for record in new
+                if not record.get("password_hash")
+            ]
+            hashes = iter(hash_passwords(to_hash, pool, workers))
+            users = [
+                User(
+                    **{name: record.get(name) or "" for name in IMPORT_FIELDS},
+                    phone_number=record.get("phone_number") or None,
+                    password=record.get("password_hash") or next(hashes),
+                )
+                for record in new
+            ]
+
+            with transaction.atomic():
+                insert_users(users)
+            result.created += len(users)
+            result.batches += 1
+            result.elapsed = time.monotonic() - started
+            if progress:
+                progress(result)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    link_mentors(mentor_pairs, batch_size, result)
+    result.elapsed = time.monotonic() - started
+    return result
@@ -0,0 +1,24 @@
+from django.db import models
+
+
+class PrefixSearchIndex(models.Index):
+    """
+    Индекс по выражению для поиска по префиксу (LIKE 'abc%'). На PostgreSQL
+    строится с text_pattern_ops, иначе такой LIKE не использует btree-индекс
+    при collation, отличной от "C".
+    """
+
+    def create_sql(self, model, schema_editor, using="", **kwargs):
+        if schema_editor.connection.vendor == "postgresql" and self.expressions:
+            from django.contrib.postgres.indexes import OpClass
+
+            index = models.Index(
+                *(
+                    OpClass(expression, name="text_pattern_ops")
+                    for expression in self.expressions
+                ),
+                name=self.name,
+                condition=self.condition,
+            )
+            return index.create_sql(model, schema_editor, using=using, **kwargs)
+        return super().create_sql(model, schema_editor, using=using, **kwargs)
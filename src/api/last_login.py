@@ -0,0 +1,123 @@
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections, connection
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+class LastLoginBuffer:
+    """
+    Копит время последнего входа пользователей в памяти воркера и
+    записывает его в БД одним UPDATE на пачку вместо UPDATE на каждый вход.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.full = threading.Event()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def record(self, user_id, when):
+        with self._lock:
+            self._pending[user_id] = max(when, self._pending.get(user_id, when))
+            if len(self._pending) >= self.max_size:
+                self.full.set()
+
+    def flush(self, batch_size=1000):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self.full.clear()
+        if not pending:
+            return 0
+
+        items = list(pending.items())
+        table = connection.ops.quote_name(User._meta.db_table)
+        try:
+            with connection.cursor() as cursor:
+                for start in range(0, len(items), batch_size):
+                    batch = items[start : start + batch_size]
+                    rows = ", ".join(["(CAST(%s AS BIGINT), %s)"] * len(batch))
+                    # Запись из другого воркера могла оказаться новее
+                    cursor.execute(
+                        f"""
+                        WITH v(id, last_login) AS (VALUES {rows})
+                        UPDATE {table} SET last_login = v.last_login
+                        FROM v WHERE {table}.id = v.id
+                        AND ({table}.last_login IS NULL
+                             OR {table}.last_login < v.last_login)
+                        """,
+                        [
+                            value
+                            for user_id, when in batch
+                            for value in (
+                                user_id,
+                                connection.ops.adapt_datetimefield_value(when),
+                            )
+                        ],
+                    )
+        except Exception:
+            # Не теряем отметки: вернем их в буфер до следующей попытки
+            for user_id, when in pending.items():
+                self.record(user_id, when)
+            raise
+        return len(items)
+
+
+last_login_buffer = LastLoginBuffer(settings.LAST_LOGIN_BUFFER_SIZE)
+
+
+class LastLoginFlusher(threading.Thread):
+    def __init__(self, buffer, interval):
+        super().__init__(name="last-login-flusher", daemon=True)
+        self.buffer = buffer
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.is_set():
+            self.buffer.full.wait(self.interval)
+            if not self.flush():
+                # БД недоступна: не повторяем запись чаще, чем раз в интервал
+                self._stopped.wait(self.interval)
+
+    def flush(self):
+        try:
+            flushed = self.buffer.flush()
+            if flushed:
+                logger.debug("Flushed last_login for %s users", flushed)
+            return True
+        except Exception:
+            logger.exception("Last login flush failed")
+            return False
+        finally:
+            close_old_connections()
+
+    def stop(self):
+        self._stopped.set()
+        self.buffer.full.set()
+        self.join()
+        # Отметки, записанные после последнего прохода потока
+        self.flush()
+
+
+_flusher = None
+
+
+def start_last_login_flusher():
+    global _flusher
+    if settings.LAST_LOGIN_MAX_STALENESS > 0 and _flusher is None:
+        _flusher = LastLoginFlusher(
+            last_login_buffer, settings.LAST_LOGIN_MAX_STALENESS
+        )
+        _flusher.start()
+        atexit.register(_flusher.stop)
+    return _flusher
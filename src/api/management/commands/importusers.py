@@ -0,0 +1,63 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.importing import import_users, read_records
+
+
+class Command(BaseCommand):
+    help = (
+        "Массовый импорт пользователей из CSV или NDJSON. "
+        "Поля: username, email, phone_number, first_name, last_name, mentor "
+        "(username ментора), password или password_hash (готовый хэш Django). "
+        "Повторный запуск пропускает уже созданных пользователей."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", type=Path)
+        parser.add_argument(
+            "--format",
+            choices=["csv", "ndjson"],
+            default=None,
+            help="По умолчанию определяется по расширению файла",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Процессов для хэширования паролей (по умолчанию по числу ядер)",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["format"] or path.suffix.lstrip(".").lower()
+        if file_format not in ("csv", "ndjson"):
+            raise CommandError("Укажите формат файла: --format csv или ndjson")
+        if not path.exists():
+            raise CommandError(f"Файл {path} не найден")
+
+        def progress(result):
+            self.stdout.write(
+                f"Пачка {result.batches}: прочитано {result.read}, "
+                f"создано {result.created} ({result.rate:.0f} польз./с)"
+            )
+
+        with path.open(encoding="utf-8", newline="") as stream:
+            result = import_users(
+                read_records(stream, file_format),
+                batch_size=options["batch_size"],
+                workers=options["workers"],
+                progress=progress,
+            )
+
+        for error in result.errors:
+            self.stderr.write(f"{error['username']}: {error['error']}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Создано: {result.created}, пропущено существующих: "
+                f"{result.skipped}, назначено менторов: {result.linked}, "
+                f"ошибок: {len(result.errors)}, время: {result.elapsed:.3f} с "
+                f"({result.rate:.0f} польз./с)"
+            )
+        )
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from api.pruning import prune_expired_tokens
+
+
+class Command(BaseCommand):
+    help = "Удаляет истекшие refresh-токены и записи черного списка пачками"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=None,
+            help="Пауза между пачками в секундах",
+        )
+        parser.add_argument("--max-batches", type=int, default=None)
+
+    def handle(self, *args, **options):
+        result = prune_expired_tokens(
+            batch_size=options["batch_size"],
+            pause=options["pause"],
+            max_batches=options["max_batches"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Удалено токенов: {result.outstanding}, "
+                f"из черного списка: {result.blacklisted}, "
+                f"пачек: {result.batches}, время: {result.elapsed:.3f} с"
+            )
+        )
@@ -0,0 +1,177 @@
+import os
+import time
+
+from django.db import connections
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# При PROMETHEUS_MULTIPROC_DIR каждый воркер пишет значения в свои
+# mmap-файлы в этом каталоге, а /metrics суммирует файлы всех воркеров
+
+REQUEST_DURATION = Histogram(
+    "api_request_duration_seconds",
+    "Время обработки запроса",
+    ["view", "method"],
+)
+RESPONSES = Counter(
+    "api_responses",
+    "Ответы по кодам состояния",
+    ["view", "method", "status"],
+)
+DB_QUERIES = Counter(
+    "api_db_queries",
+    "Запросы к БД при обработке запросов",
+    ["view"],
+)
+DB_DURATION = Counter(
+    "api_db_duration_seconds",
+    "Время выполнения запросов к БД",
+    ["view"],
+)
+AUTH_EVENTS = Counter(
+    "api_auth_events",
+    "События аутентификации: login, refresh и logout с исходом success "
+    "или failure, blacklist_hit — предъявлен отозванный токен",
+    ["event"],
+)
+# Пулы подключений psycopg: состояние суммируется по живым процессам,
+# счетчики пополняются из pop_stats() пула
+POOL_CONNECTIONS = Gauge(
+    "api_db_pool_connections",
+    "Подключения в пулах: все открытые (state=open) и свободные (state=idle)",
+    ["alias", "state"],
+    multiprocess_mode="livesum",
+)
+POOL_WAITING = Gauge(
+    "api_db_pool_requests_waiting",
+    "Запросы, ожидающие свободного подключения",
+    ["alias"],
+    multiprocess_mode="livesum",
+)
+POOL_REQUESTS = Counter(
+    "api_db_pool_requests",
+    "Выдачи подключений из пула",
+    ["alias"],
+)
+POOL_QUEUED = Counter(
+    "api_db_pool_requests_queued",
+    "Выдачи, ждавшие освобождения подключения",
+    ["alias"],
+)
+POOL_WAIT = Counter(
+    "api_db_pool_wait_seconds",
+    "Время ожидания подключений из пула",
+    ["alias"],
+)
+POOL_OPENED = Counter(
+    "api_db_pool_connections_opened",
+    "Подключения, открытые пулом",
+    ["alias"],
+)
+POOL_ERRORS = Counter(
+    "api_db_pool_errors",
+    "Ошибки пула: timeout — подключение не получено за DB_POOL_TIMEOUT, "
+    "connect — ошибка подключения, lost — подключение не прошло проверку, "
+    "bad_return — возвращено в пул в неисправном состоянии",
+    ["alias", "error"],
+)
+
+# Счетчик pop_stats() пула -> метрика и метки после alias
+POOL_COUNTERS = {
+    "requests_num": (POOL_REQUESTS, ()),
+    "requests_queued": (POOL_QUEUED, ()),
+    "connections_num": (POOL_OPENED, ()),
+    "requests_errors": (POOL_ERRORS, ("timeout",)),
+    "connections_errors": (POOL_ERRORS, ("connect",)),
+    "connections_lost": (POOL_ERRORS, ("lost",)),
+    "returns_bad": (POOL_ERRORS, ("bad_return",)),
+}
+
+# Статистика пулов снимается не чаще раза в интервал (в секундах)
+POOL_STATS_INTERVAL = 1.0
+_pool_stats_at = 0.0
+
+METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+# (представление, метод, код) -> ряды метрик; labels() на каждый запрос
+# заметно дороже самой записи значения
+_series = {}
+
+
+def get_series(view, method, status):
+    key = (view, method, status)
+    series = _series.get(key)
+    if series is None:
+        series = _series[key] = (
+            REQUEST_DURATION.labels(view, method),
+            RESPONSES.labels(view, method, str(status)),
+            DB_QUERIES.labels(view),
+            DB_DURATION.labels(view),
+        )
+    return series
+
+
+def record_request(request, response, duration):
+    match = request.resolver_match
+    # Неизвестные пути и методы не порождают новых рядов
+    view = match.view_name if match else "unmatched"
+    method = request.method if request.method in METHODS else "other"
+    latency, responses, queries, db_duration = get_series(
+        view, method, response.status_code
+    )
+    latency.observe(duration)
+    responses.inc()
+    count = getattr(response, "db_queries", None)
+    if count:
+        queries.inc(count)
+        db_duration.inc(response.db_time)
+
+
+def database_pools():
+    for alias in connections:
+        if connections.settings[alias].get("OPTIONS", {}).get("pool"):
+            yield alias, connections[alias].pool
+
+
+def record_pool_stats(pools=None):
+    for alias, pool in database_pools() if pools is None else pools:
+        stats = pool.pop_stats()
+        POOL_CONNECTIONS.labels(alias, "open").set(stats["pool_size"])
+        POOL_CONNECTIONS.labels(alias, "idle").set(stats["pool_available"])
+        POOL_WAITING.labels(alias).set(stats["requests_waiting"])
+        POOL_WAIT.labels(alias).inc(stats.get("requests_wait_ms", 0) / 1000)
+        for key, (counter, labels) in POOL_COUNTERS.items():
+            if stats.get(key):
+                counter.labels(alias, *labels).inc(stats[key])
+
+
+def record_pool_stats_periodically():
+    global _pool_stats_at
+    now = time.monotonic()
+    if now - _pool_stats_at >= POOL_STATS_INTERVAL:
+        _pool_stats_at = now
+        record_pool_stats()
+
+
+def record_auth_event(event):
+    AUTH_EVENTS.labels(event).inc()
+
+
+def metrics_view(request):
+    """Метрики в текстовом формате Prometheus."""
+    record_pool_stats()
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
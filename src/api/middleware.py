@@ -0,0 +1,160 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+from .metrics import record_pool_stats_periodically, record_request
+
+logger = logging.getLogger(__name__)
+
+
+# Управление транзакциями не считается запросом: BEGIN и COMMIT не проходят
+# через курсор, а точки сохранения в тестах добавляет обертка TestCase
+TRANSACTION_STATEMENTS = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+
+
+class QueryStats:
+    """Число запросов к БД и время их выполнения, по всем подключениям."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            if not sql.startswith(TRANSACTION_STATEMENTS):
+                self.count += 1
+
+    @contextmanager
+    def record(self):
+        for alias in connections:
+            install_query_counter(connections[alias])
+        token = _current_stats.set(self)
+        try:
+            yield self
+        finally:
+            _current_stats.reset(token)
+
+
+# Счетчик текущего запроса. sync_to_async копирует контекст в поток
+# исполнителя, поэтому запросы async ORM попадают в тот же счетчик
+_current_stats = ContextVar("query_stats", default=None)
+
+
+def count_query(execute, sql, params, many, context):
+    stats = _current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+
+def install_query_counter(connection):
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+def get_query_budget(view_func, method):
+    """
+    Бюджет запросов представления: атрибут query_budget класса
+    представления, число или словарь {метод: число}. None — без бюджета.
+    """
+    view_class = getattr(view_func, "view_class", None)
+    budget = getattr(view_class, "query_budget", None)
+    if isinstance(budget, dict):
+        return budget.get(method)
+    return budget
+
+
+class QueryBudgetMiddleware:
+    """
+    Считает запросы к БД и их время на каждый запрос: добавляет заголовок
+    Server-Timing (при SERVER_TIMING) и пишет в журнал запросы, превысившие
+    бюджет представления. Запросы при итерации потоковых ответов не учитываются.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with QueryStats().record() as stats:
+            response = self.get_response(request)
+        return self.report(request, response, stats, started)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with QueryStats().record() as stats:
+            response = await self.get_response(request)
+        return self.report(request, response, stats, started)
+
+    def report(self, request, response, stats, started):
+        match = request.resolver_match
+        budget = match and get_query_budget(match.func, request.method)
+        response.db_queries = stats.count
+        response.db_time = stats.duration
+        response.query_budget = budget
+
+        if budget is not None and stats.count > budget:
+            logger.warning(
+                "Query budget exceeded: %s %s (%s) made %s queries, budget %s, "
+                "%.1f ms in DB",
+                request.method,
+                request.path,
+                match.view_name,
+                stats.count,
+                budget,
+                stats.duration * 1000,
+            )
+        if settings.SERVER_TIMING:
+            response["Server-Timing"] = (
+                f'db;desc="{stats.count} queries";dur={stats.duration * 1000:.2f}, '
+                f"total;dur={(time.perf_counter() - started) * 1000:.2f}"
+            )
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Время обработки, коды ответов и запросы к БД в метриках Prometheus,
+    раз в POOL_STATS_INTERVAL — состояние пулов подключений. Стоит перед
+    QueryBudgetMiddleware, чтобы получить число запросов к БД.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        record_request(request, response, time.perf_counter() - started)
+        record_pool_stats_periodically()
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        record_request(request, response, time.perf_counter() - started)
+        record_pool_stats_periodically()
+        return response
@@ -0,0 +1,20 @@
+# Generated by Django 6.1.2 on 2026-10-18 08:56
+
+from django.db import migrations
+
+import api.models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name="apiuser",
+            managers=[
+                ("objects", api.models.ApiUserManager()),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.1.2 on 2026-10-18 09:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0002_apiuser_manager"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="apiuser",
+            name="version",
+            field=models.PositiveBigIntegerField(default=1, editable=False),
+        ),
+    ]
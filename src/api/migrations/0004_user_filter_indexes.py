@@ -0,0 +1,38 @@
+# Generated by Django 6.1.2 on 2026-10-18 09:43
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+import api.indexes
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0003_apiuser_version"),
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="apiuser",
+            index=api.indexes.PrefixSearchIndex(
+                django.db.models.functions.text.Lower("username"),
+                name="api_user_username_lower_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="apiuser",
+            index=api.indexes.PrefixSearchIndex(
+                django.db.models.functions.text.Lower("email"),
+                name="api_user_email_lower_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="apiuser",
+            index=models.Index(
+                condition=models.Q(("mentor__isnull", False)),
+                fields=["id"],
+                name="api_user_has_mentor_idx",
+            ),
+        ),
+    ]
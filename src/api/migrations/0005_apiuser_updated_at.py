@@ -0,0 +1,27 @@
+# Generated by Django 6.1.2 on 2026-10-18 10:57
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("api", "0004_user_filter_indexes"),
+        ("auth", "0012_alter_user_first_name_max_length"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="apiuser",
+            name="updated_at",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now, editable=False
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="apiuser",
+            index=models.Index(
+                fields=["updated_at", "id"], name="api_user_updated_at_idx"
+            ),
+        ),
+    ]
@@ -1,8 +1,61 @@
-from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.contrib.auth.models import AbstractUser, UserManager
+from django.db import models, transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from .caches import invalidate_user_details
+from .hashing import make_password, verify_password
+from .indexes import PrefixSearchIndex
+
+
+def touched_values():
+    """Значения для UPDATE, отмечающие изменение представления пользователя."""
+    return {"version": F("version") + 1, "updated_at": timezone.now()}
+
+
+class ApiUserQuerySet(models.QuerySet):
+    def with_is_mentor(self):
+        return self.annotate(
+            has_mentees=Exists(self.model.objects.filter(mentor=OuterRef("pk")))
+        )
+
+    def lock(self):
+        # SELECT ... FOR UPDATE в порядке id, возвращает id заблокированных строк
+        return list(
+            self.select_for_update().order_by("pk").values_list("pk", flat=True)
+        )
+
+    def touch(self):
+        # Меняет версию и время изменения пользователей и сбрасывает их кэш.
+        # Время берется после блокировки строк: иначе после ожидания чужой
+        # транзакции строка оказалась бы позади курсора ленты изменений
+        with transaction.atomic(savepoint=False):
+            return self.model.objects.touch_locked(self.lock())
+
+    def touch_ids(self, pks):
+        # touch() для заранее известных id
+        pks = {pk for pk in pks if pk is not None}
+        return self.model.objects.filter(pk__in=pks).touch() if pks else 0
+
+    def touch_locked(self, pks):
+        # touch() для строк, уже заблокированных текущей транзакцией
+        if pks:
+            self.model.objects.filter(pk__in=pks).update(**touched_values())
+            invalidate_user_details(pks)
+        return len(pks)
+
+
+class ApiUserManager(UserManager.from_queryset(ApiUserQuerySet)):
+    pass
 
 
 class ApiUser(AbstractUser):
+    # Поля, изменение которых меняет представление ментора или менти
+    RELATED_FIELDS = ("username", "mentor_id")
+    # Поля, изменение которых не меняет представление пользователя
+    UNVERSIONED_FIELDS = frozenset({"last_login", "password"})
+
     phone_number = models.CharField(max_length=20, blank=True, null=True)
     mentor = models.ForeignKey(
         "self",
@@ -11,7 +64,100 @@ class ApiUser(AbstractUser):
         on_delete=models.SET_NULL,
         related_name="mentees",
     )
+    version = models.PositiveBigIntegerField(default=1, editable=False)
+    # Время последнего изменения представления, см. GET /api/users/changes/
+    updated_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    objects = ApiUserManager()
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Поиск ?search= по префиксу username и email без учета регистра
+            PrefixSearchIndex(Lower("username"), name="api_user_username_lower_idx"),
+            PrefixSearchIndex(Lower("email"), name="api_user_email_lower_idx"),
+            # Фильтр ?has_mentor=true с сортировкой по id
+            models.Index(
+                fields=["id"],
+                condition=Q(mentor__isnull=False),
+                name="api_user_has_mentor_idx",
+            ),
+            # Keyset-выборка изменений по (updated_at, id)
+            models.Index(fields=["updated_at", "id"], name="api_user_updated_at_idx"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            field: instance.__dict__[field]
+            for field in cls.RELATED_FIELDS
+            if field in instance.__dict__
+        }
+        return instance
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and set(update_fields) <= self.UNVERSIONED_FIELDS:
+            return super().save(*args, **kwargs)
+
+        adding = self._state.adding
+        loaded = getattr(self, "_loaded_values", {})
+        changed = {
+            field
+            for field in self.RELATED_FIELDS
+            if field in self.__dict__
+            and (adding or field in loaded)
+            and loaded.get(field) != self.__dict__[field]
+        }
+
+        mentors = set()
+        if "mentor_id" in changed:
+            mentors = {loaded.get("mentor_id"), self.mentor_id}
+        rows = Q(pk__in=mentors - {None})
+        if "username" in changed and not adding:
+            rows |= Q(pk=self.mentor_id) | Q(mentor=self)
+        if not adding:
+            rows |= Q(pk=self.pk)
+
+        with transaction.atomic(savepoint=False):
+            # Строка и связанные пользователи блокируются до того, как взять
+            # время изменения (см. ApiUserQuerySet.touch)
+            related = set(ApiUser.objects.filter(rows).lock()) - {self.pk}
+            self.updated_at = timezone.now()
+            if not adding:
+                # Инкремент в БД не теряет изменений, сделанных через touch()
+                self.version = F("version") + 1
+                if update_fields is not None:
+                    kwargs["update_fields"] = {*update_fields, "version", "updated_at"}
+
+            super().save(*args, **kwargs)
+            if not adding:
+                # Актуальная версия подгрузится из БД при обращении
+                del self.__dict__["version"]
+            ApiUser.objects.touch_locked(related)
+
+        self._loaded_values = {
+            field: self.__dict__[field]
+            for field in self.RELATED_FIELDS
+            if field in self.__dict__
+        }
+
+    def set_password(self, raw_password):
+        # Хэширование выполняется в пуле процессов, см. api.hashing
+        self.password = make_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        valid, must_update = verify_password(raw_password, self.password)
+        if valid and must_update:
+            self.set_password(raw_password)
+            self._password = None
+            self.save(update_fields=["password"])
+        return valid
 
     @property
     def is_mentor(self):
+        # Значение из аннотации with_is_mentor() избавляет от запроса на объект
+        if hasattr(self, "has_mentees"):
+            return self.has_mentees
         return self.mentees.exists()
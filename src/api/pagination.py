@@ -0,0 +1,187 @@
+import base64
+import binascii
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import (
+    BasePagination,
+    CursorPagination,
+    LimitOffsetPagination,
+    _positive_int,
+)
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class IdCursorPagination(CursorPagination):
+    """Keyset-пагинация по `id` без подсчета общего количества."""
+
+    ordering = "id"
+    page_size_query_param = "limit"
+    max_page_size = 1000
+
+
+class CursorPaginationMixin:
+    """
+    Позволяет view переключаться на keyset-пагинацию
+    параметром `?pagination=cursor`.
+    """
+
+    cursor_pagination_class = IdCursorPagination
+    pagination_mode_param = "pagination"
+
+    def use_cursor_pagination(self):
+        request = getattr(self, "request", None)
+        if request is None:
+            return False
+        return request.query_params.get(self.pagination_mode_param) == "cursor"
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            if self.use_cursor_pagination():
+                self._paginator = self.cursor_pagination_class()
+            elif self.pagination_class is None:
+                self._paginator = None
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+
+class UncountedLimitOffsetPagination(LimitOffsetPagination):
+    """
+    Limit/offset без COUNT(*): страница выбирается функцией fetch(limit, offset),
+    а наличие следующей страницы определяется по лишней строке.
+    """
+
+    def paginate_rows(self, fetch, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.offset = self.get_offset(request)
+        rows = list(fetch(self.limit + 1, self.offset))
+        self.has_next = len(rows) > self.limit
+        return rows[: self.limit]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(
+            url, self.offset_query_param, self.offset + self.limit
+        )
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"].pop("count")
+        response_schema["required"].remove("count")
+        return response_schema
+
+
+class ChangesCursorPagination(BasePagination):
+    """
+    Keyset-пагинация по (updated_at, id) для синхронизации изменений.
+    Курсор ?since= указывает на последнюю отданную строку, ответ содержит
+    курсор для следующего запроса; пустая страница возвращает тот же курсор.
+    Строки моложе USER_CHANGES_SETTLE_SECONDS не отдаются: транзакция с более
+    ранней отметкой времени может завершиться позже, и ее строка оказалась бы
+    позади уже выданного курсора.
+    """
+
+    cursor_query_param = "since"
+    limit_query_param = "limit"
+    default_limit = 500
+    max_limit = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor = request.query_params.get(self.cursor_query_param)
+        limit = self.get_limit(request)
+        settled = timezone.now() - timedelta(
+            seconds=settings.USER_CHANGES_SETTLE_SECONDS
+        )
+        queryset = queryset.filter(updated_at__lte=settled)
+        if self.cursor:
+            updated_at, pk = self.decode_cursor(self.cursor)
+            queryset = queryset.filter(updated_at__gte=updated_at).exclude(
+                updated_at=updated_at, id__lte=pk
+            )
+        rows = list(queryset.order_by("updated_at", "id")[: limit + 1])
+        self.has_more = len(rows) > limit
+        rows = rows[:limit]
+        if rows:
+            self.cursor = self.encode_cursor(rows[-1]["updated_at"], rows[-1]["id"])
+        return rows
+
+    def get_limit(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.limit_query_param],
+                strict=True,
+                cutoff=self.max_limit,
+            )
+        except (KeyError, ValueError):
+            return self.default_limit
+
+    def encode_cursor(self, updated_at, pk):
+        value = f"{updated_at.isoformat()} {pk}".encode()
+        return base64.urlsafe_b64encode(value).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            value = base64.urlsafe_b64decode(cursor.encode()).decode()
+            updated_at, pk = value.split(" ")
+            updated_at = datetime.fromisoformat(updated_at)
+            if timezone.is_naive(updated_at):
+                raise ValueError(value)
+            return updated_at, int(pk)
+        except (binascii.Error, UnicodeError, ValueError):
+            raise ValidationError({self.cursor_query_param: "Неверный курсор"})
+
+    def get_paginated_response(self, data):
+        return Response(
+            {"cursor": self.cursor, "has_more": self.has_more, "results": data}
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["cursor", "has_more", "results"],
+            "properties": {
+                "cursor": {
+                    "type": "string",
+                    "nullable": True,
+                    "description": "Значение since для следующего запроса",
+                },
+                "has_more": {"type": "boolean"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Курсор из предыдущего ответа; без него — с начала",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.limit_query_param,
+                "required": False,
+                "in": "query",
+                "description": f"Число строк, не больше {self.max_limit}",
+                "schema": {"type": "integer"},
+            },
+        ]
@@ -0,0 +1,31 @@
+import io
+import re
+
+import orjson
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+
+# orjson читает целые вне 64 бит как float, json — как int
+LONG_NUMBER = re.compile(rb"\d{19}")
+
+
+class ORJSONParser(JSONParser):
+    """
+    JSONParser на orjson для тел в UTF-8. Тела, которые orjson не разбирает
+    или разбирает иначе (длинные числа), передаются JSONParser: результат
+    и текст ошибки остаются прежними.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if encoding.lower().replace("_", "-") not in ("utf-8", "utf8"):
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        if LONG_NUMBER.search(body):
+            return super().parse(io.BytesIO(body), media_type, parser_context)
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return super().parse(io.BytesIO(body), media_type, parser_context)
@@ -0,0 +1,98 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PruneResult:
+    outstanding: int = 0
+    blacklisted: int = 0
+    batches: int = 0
+    elapsed: float = 0.0
+
+
+def prune_expired_tokens(batch_size=None, pause=None, max_batches=None):
+    """
+    Удаляет истекшие токены небольшими пачками, каждая в своей транзакции,
+    чтобы не держать долгих блокировок на таблицах токенов.
+
+    Пачка выбирается через SELECT ... FOR UPDATE SKIP LOCKED: очистка,
+    запущенная в нескольких воркерах, делит токены между ними, а не удаляет
+    одни и те же строки одновременно.
+    """
+    batch_size = batch_size or settings.TOKEN_PRUNE_BATCH_SIZE
+    pause = settings.TOKEN_PRUNE_PAUSE if pause is None else pause
+    result = PruneResult()
+    started = time.monotonic()
+    now = timezone.now()
+
+    while max_batches is None or result.batches < max_batches:
+        with transaction.atomic():
+            ids = list(
+                OutstandingToken.objects.filter(expires_at__lte=now)
+                .select_for_update(skip_locked=True)
+                .order_by("id")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            blacklisted, _ = BlacklistedToken.objects.filter(token_id__in=ids).delete()
+            outstanding, _ = OutstandingToken.objects.filter(id__in=ids).delete()
+
+        result.blacklisted += blacklisted
+        result.outstanding += outstanding
+        result.batches += 1
+        if len(ids) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+
+    result.elapsed = time.monotonic() - started
+    return result
+
+
+class TokenPruner(threading.Thread):
+    def __init__(self, interval):
+        super().__init__(name="token-pruner", daemon=True)
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                result = prune_expired_tokens()
+                logger.info(
+                    "Pruned %s outstanding and %s blacklisted tokens in %.3fs",
+                    result.outstanding,
+                    result.blacklisted,
+                    result.elapsed,
+                )
+            except Exception:
+                logger.exception("Token pruning failed")
+            finally:
+                close_old_connections()
+
+    def stop(self):
+        self._stopped.set()
+
+
+_pruner = None
+
+
+def start_token_pruner():
+    global _pruner
+    if settings.TOKEN_PRUNE_INTERVAL > 0 and _pruner is None:
+        _pruner = TokenPruner(settings.TOKEN_PRUNE_INTERVAL)
+        _pruner.start()
+    return _pruner
@@ -0,0 +1,43 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+
+# Дата и время, dataclass и прочие типы сериализуются кодировщиком DRF,
+# чтобы их представление совпадало с JSONRenderer
+ORJSON_OPTIONS = (
+    orjson.OPT_PASSTHROUGH_DATETIME
+    | orjson.OPT_PASSTHROUGH_DATACLASS
+    | orjson.OPT_NON_STR_KEYS
+)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer на orjson. Ответ совпадает с JSONRenderer побайтно
+    при настройках DRF по умолчанию (UNICODE_JSON, COMPACT_JSON);
+    иначе, а также для отступов и данных, которые orjson не кодирует
+    (например, целые вне 64 бит), используется JSONRenderer.
+    Дробные числа меньше 1e-4 orjson записывает без экспоненты.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+        if indent is not None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data, default=self.encoder_class().default, option=ORJSON_OPTIONS
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # JSONRenderer экранирует U+2028 и U+2029 для встраивания в JavaScript
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+                b"\xe2\x80\xa9", b"\\u2029"
+            )
+        return ret
@@ -0,0 +1,130 @@
+import random
+
+from asgiref.local import Local
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+# Метки недавней записи хранятся отдельно от кэша профилей, чтобы его
+# вытеснение не возвращало автора записи на отстающую реплику
+MARKER_CACHE = "replica_markers"
+
+# Псевдоним БД для чтения в текущем запросе: реплика, DEFAULT_DB_ALIAS после
+# недавней записи пользователя или None вне чтения через реплики
+_state = Local()
+
+
+def read_alias():
+    return getattr(_state, "alias", None)
+
+
+def reading_from_replica():
+    return read_alias() not in (None, DEFAULT_DB_ALIAS)
+
+
+def reading_after_write():
+    """Чтение переведено в основную БД после недавней записи пользователя."""
+    return read_alias() == DEFAULT_DB_ALIAS
+
+
+def recent_write_key(user_id):
+    return f"db-primary:{user_id}"
+
+
+def mark_recent_write(user_id):
+    caches[MARKER_CACHE].set(
+        recent_write_key(user_id), True, settings.DB_REPLICA_STICKY_SECONDS
+    )
+
+
+def stick_after_write(user_id):
+    """Переводит чтение запроса на основную БД после недавней записи пользователя."""
+    if reading_from_replica() and caches[MARKER_CACHE].get(recent_write_key(user_id)):
+        _state.alias = DEFAULT_DB_ALIAS
+
+
+async def astick_after_write(user_id):
+    if reading_from_replica() and await caches[MARKER_CACHE].aget(
+        recent_write_key(user_id)
+    ):
+        _state.alias = DEFAULT_DB_ALIAS
+
+
+class ReplicaRouter:
+    """
+    Чтение в запросах GET, HEAD и OPTIONS идет в реплику, выбранную
+    ReplicaMiddleware; запись и остальное чтение — в основную БД.
+    """
+
+    def db_for_read(self, model, **hints):
+        return read_alias()
+
+    def db_for_write(self, model, **hints):
+        # Без явного ответа Django пишет в БД, из которой прочитан объект
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная БД
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaMiddleware:
+    """
+    Выбирает реплику для чтения в безопасных запросах. После запроса
+    с записью чтение пользователя DB_REPLICA_STICKY_SECONDS секунд идет
+    в основную БД: метку в кэше проверяет аутентификация.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        previous = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.alias = previous
+        self.finish(request)
+        return response
+
+    async def __acall__(self, request):
+        previous = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.alias = previous
+        if settings.DATABASE_REPLICAS and request.method not in SAFE_METHODS:
+            # Пользователь сессии загружается из БД
+            await sync_to_async(self.finish)(request)
+        return response
+
+    def start(self, request):
+        previous = read_alias()
+        if settings.DATABASE_REPLICAS and request.method in SAFE_METHODS:
+            _state.alias = random.choice(settings.DATABASE_REPLICAS)
+        else:
+            _state.alias = None
+        return previous
+
+    def finish(self, request):
+        if not settings.DATABASE_REPLICAS or request.method in SAFE_METHODS:
+            return
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            mark_recent_write(user.pk)
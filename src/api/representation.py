@@ -0,0 +1,117 @@
+from collections.abc import Mapping
+from functools import cache
+from operator import attrgetter, itemgetter
+
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+# Поля, значения которых из БД уже имеют тип представления:
+# вызов to_representation поля для них ничего не меняет
+PASSTHROUGH_FIELDS = {
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.EmailField,
+    serializers.IntegerField,
+    serializers.ReadOnlyField,
+}
+
+
+def is_passthrough(field):
+    if type(field) is serializers.BigIntegerField:
+        return not getattr(
+            field, "coerce_to_string", api_settings.COERCE_BIGINT_TO_STRING
+        )
+    return type(field) in PASSTHROUGH_FIELDS
+
+
+def field_spec(serializer):
+    """
+    Описание читаемых полей сериализатора для compile_representation:
+    кортежи (вид, имя, источник). None, если есть поля другого вида.
+    """
+    spec = []
+    for field in serializer._readable_fields:
+        if isinstance(field, serializers.SerializerMethodField):
+            spec.append(("method", field.field_name, field.method_name))
+        elif (
+            is_passthrough(field)
+            and len(field.source_attrs) == 1
+            and field.source.isidentifier()
+        ):
+            spec.append(("value", field.field_name, field.source))
+        else:
+            return None
+    return tuple(spec)
+
+
+@cache
+def compile_representation(spec, omit_empty, rows):
+    """
+    Строит функцию bind(serializer) -> represent(obj) для строк .values()
+    (rows) или объектов моделей. Значения полей читаются заранее созданными
+    itemgetter/attrgetter, методы SerializerMethodField связываются в bind
+    один раз на экземпляр сериализатора.
+    """
+    getter = itemgetter if rows else attrgetter
+    fields = tuple(
+        (kind, name, source if kind == "method" else getter(source))
+        for kind, name, source in spec
+    )
+    omit = tuple(name for name in omit_empty if name in {f[1] for f in fields})
+
+    def bind(serializer):
+        bound = tuple(
+            (name, getattr(serializer, value) if kind == "method" else value)
+            for kind, name, value in fields
+        )
+
+        def represent(obj):
+            rep = {name: value(obj) for name, value in bound}
+            for name in omit:
+                if rep[name] in (None, []):
+                    del rep[name]
+            return rep
+
+        return represent
+
+    return bind
+
+
+# (класс сериализатора, ключ набора полей, строки) -> bind или None
+_compiled = {}
+
+
+class CompiledRepresentationMixin:
+    # Представление для чтения без обхода полей DRF на каждый объект:
+    # функция строится compile_representation один раз на класс и набор
+    # полей, поля сериализатора при этом создаются только первый раз.
+    # Поля из omit_empty_fields убираются из ответа, если они пусты.
+    # Сериализаторы с полями других видов используют путь DRF.
+
+    omit_empty_fields = ()
+
+    def representation_key(self):
+        # Все, от чего зависит набор полей экземпляра сериализатора
+        return None
+
+    def to_representation(self, instance):
+        rows = isinstance(instance, Mapping)
+        represent = self.__dict__.get("_represent", {}).get(rows)
+        if represent is None:
+            key = (type(self), self.representation_key(), rows)
+            if key not in _compiled:
+                spec = field_spec(self)
+                _compiled[key] = spec and compile_representation(
+                    spec, tuple(self.omit_empty_fields), rows
+                )
+            bind = _compiled[key]
+            represent = bind(self) if bind else self.to_representation_fallback
+            self.__dict__.setdefault("_represent", {})[rows] = represent
+        return represent(instance)
+
+    def to_representation_fallback(self, instance):
+        representation = super().to_representation(instance)
+        for field in self.omit_empty_fields:
+            if field in representation and representation[field] in [None, []]:
+                representation.pop(field)
+        return representation
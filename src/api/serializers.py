@@ -1,12 +1,44 @@
 import re
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
 from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
+from rest_framework_simplejwt import serializers as jwt_serializers
+
+from .caches import invalidate_user_details
+from .fieldsets import SparseFieldsetSerializerMixin
+from .hierarchy import creates_cycle, users_in_cycles
+from .last_login import last_login_buffer
+from .models import touched_values
+from .representation import CompiledRepresentationMixin
+from .tokens import RefreshToken
 
 User = get_user_model()
 
 
+class TokenObtainPairSerializer(jwt_serializers.TokenObtainPairSerializer):
+    token_class = RefreshToken
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        if settings.LAST_LOGIN_MAX_STALENESS > 0:
+            # Время входа запишет фоновый поток, см. api.last_login
+            last_login_buffer.record(self.user.pk, timezone.now())
+        return data
+
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    token_class = RefreshToken
+
+
+class TokenBlacklistSerializer(jwt_serializers.TokenBlacklistSerializer):
+    token_class = RefreshToken
+
+
 class RegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
     phone_number = serializers.CharField(required=False)
@@ -33,21 +65,54 @@ class RegistrationSerializer(serializers.ModelSerializer):
         return user
 
 
-class UserListSerializer(serializers.ModelSerializer):
-    is_mentor = serializers.SerializerMethodField()
+class UserListSerializer(
+    SparseFieldsetSerializerMixin,
+    CompiledRepresentationMixin,
+    serializers.ModelSerializer,
+):
+    is_mentor = serializers.BooleanField(read_only=True)
 
     class Meta:
         model = User
         fields = ["id", "username", "is_mentor"]
 
-    @extend_schema_field(bool)
-    def get_is_mentor(self, user):
-        return user.is_mentor
 
+class UserHierarchySerializer(CompiledRepresentationMixin, serializers.ModelSerializer):
+    mentor_id = serializers.IntegerField()
+    depth = serializers.IntegerField()
+
+    class Meta:
+        model = User
+        fields = ["id", "username", "mentor_id", "depth"]
+
+
+class UserChangeSerializer(CompiledRepresentationMixin, serializers.ModelSerializer):
+    mentor = serializers.CharField(source="mentor_username", allow_null=True)
+    is_mentor = serializers.BooleanField()
 
-class UserDetailSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = [
+            "id",
+            "username",
+            "email",
+            "phone_number",
+            "mentor",
+            "is_mentor",
+            "is_active",
+            "version",
+            "updated_at",
+        ]
+
+
+class UserDetailSerializer(
+    SparseFieldsetSerializerMixin,
+    CompiledRepresentationMixin,
+    serializers.ModelSerializer,
+):
     mentor = serializers.SerializerMethodField()
     mentees = serializers.SerializerMethodField()
+    omit_empty_fields = ("mentor", "mentees")
 
     class Meta:
         model = User
@@ -68,16 +133,7 @@ class UserDetailSerializer(serializers.ModelSerializer):
 
     @extend_schema_field(list[str])
     def get_mentees(self, user):
-        if user.mentees.exists():
-            return [mentee.username for mentee in user.mentees.all()]
-        return []
-
-    def to_representation(self, instance):
-        representation = super().to_representation(instance)
-        for field in ["mentor", "mentees"]:
-            if representation[field] in [None, []]:
-                representation.pop(field)
-        return representation
+        return [mentee.username for mentee in user.mentees.all()]
 
 
 class UserUpdateSerializer(serializers.ModelSerializer):
@@ -107,7 +163,7 @@ class UserUpdateSerializer(serializers.ModelSerializer):
 
     @extend_schema_field(list[str])
     def get_mentees_data(self, obj):
-        return [mentee.username for mentee in obj.mentees.all()]
+        return list(obj.mentees.values_list("username", flat=True))
 
     def validate(self, attrs):
         if "new_password" in attrs:
@@ -115,6 +171,22 @@ class UserUpdateSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError("Старый пароль не указан")
             if not self.instance.check_password(attrs["old_password"]):
                 raise serializers.ValidationError("Старый пароль неверный")
+
+        if "mentor" in attrs or "mentees" in attrs:
+            mentee_ids = {mentee.pk for mentee in attrs.get("mentees", [])}
+            if "mentor" in attrs:
+                mentor_id = attrs["mentor"].pk if attrs["mentor"] else None
+            else:
+                mentor_id = self.instance.mentor_id
+            # Цепочка менторов после изменения не должна вернуться
+            # к пользователю или его новым менти
+            if self.instance.pk in mentee_ids or (
+                mentor_id is not None
+                and creates_cycle(mentor_id, mentee_ids | {self.instance.pk})
+            ):
+                raise serializers.ValidationError(
+                    "Назначение создает цикл наставничества"
+                )
         return attrs
 
     def validate_mentor(self, value):
@@ -126,29 +198,85 @@ class UserUpdateSerializer(serializers.ModelSerializer):
         return None
 
     def validate_mentees(self, values):
-        if values:
-            try:
-                return User.objects.filter(username__in=values)
-            except User.DoesNotExist:
-                raise serializers.ValidationError("Менти не найдены")
-        return []
+        usernames = set(values)
+        mentees = list(User.objects.filter(username__in=usernames).only("username"))
+        missing = usernames - {mentee.username for mentee in mentees}
+        if missing:
+            raise serializers.ValidationError(
+                f"Пользователи не найдены: {', '.join(sorted(missing))}"
+            )
+        return mentees
+
+    def update_mentees(self, instance, mentees):
+        """
+        Приводит менти пользователя к mentees по разнице с текущим набором:
+        по одному UPDATE на добавленных и удаленных менти и на их прежних
+        менторов. Возвращает True, если набор менти изменился.
+        """
+        requested = {mentee.pk for mentee in mentees}
+        # Вместе с менти блокируются прежние менторы пользователя и
+        # добавляемых менти и новый ментор, которых затронет и save():
+        # время изменения должно браться после ожидания всех блокировок
+        mentors = User.objects.filter(Q(pk=instance.pk) | Q(pk__in=requested))
+        rows = list(
+            User.objects.select_for_update()
+            .filter(
+                Q(pk=instance.pk)
+                | Q(mentor=instance)
+                | Q(pk__in=requested)
+                | Q(pk__in=mentors.values("mentor_id"))
+                | Q(pk=instance.mentor_id)
+            )
+            .order_by("pk")
+            .values_list("pk", "mentor_id")
+        )
+        current = {pk for pk, mentor_id in rows if mentor_id == instance.pk}
+        added, removed = requested - current, current - requested
+        if not added and not removed:
+            return False
+
+        # Прежние менторы добавленных менти теряют их из своего представления
+        previous_mentors = {
+            mentor_id for pk, mentor_id in rows if pk in added and mentor_id is not None
+        }
+        if removed:
+            User.objects.filter(pk__in=removed).update(mentor=None, **touched_values())
+        if added:
+            User.objects.filter(pk__in=added).update(
+                mentor=instance, **touched_values()
+            )
+        invalidate_user_details([*added, *removed])
+        User.objects.touch_locked(previous_mentors)
+        return True
 
     def update(self, instance, validated_data):
+        validated_data.pop("old_password", None)
+        mentees = validated_data.pop("mentees", None)
+        update_fields = set()
+
         if "new_password" in validated_data:
             instance.set_password(validated_data.pop("new_password"))
-            validated_data.pop("old_password", None)
-            instance.save()
-
-        if "mentees" in validated_data:
-            instance.mentees.set(validated_data.pop("mentees"))
+            update_fields.add("password")
 
         if "mentor" in validated_data:
-            instance.mentor = validated_data.pop("mentor")
+            mentor = validated_data.pop("mentor")
+            if instance.mentor_id != (mentor.pk if mentor else None):
+                instance.mentor = mentor
+                update_fields.add("mentor")
 
         for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-
-        instance.save()
+            if getattr(instance, attr) != value:
+                setattr(instance, attr, value)
+                update_fields.add(attr)
+
+        if mentees is None and not update_fields:
+            return instance
+        with transaction.atomic():
+            # Изменение менти меняет представление пользователя и его версию
+            if mentees is not None and self.update_mentees(instance, mentees):
+                update_fields.add("version")
+            if update_fields:
+                instance.save(update_fields=update_fields)
         return instance
 
     def to_representation(self, instance):
@@ -159,7 +287,111 @@ class UserUpdateSerializer(serializers.ModelSerializer):
         representation["mentees"] = representation.pop("mentees_data", [])
 
         for field in ["mentor", "mentees"]:
-            if representation[field] in [None, []]:
+            if field in representation and representation[field] in [None, []]:
                 representation.pop(field)
 
         return representation
+
+
+class MentorshipAssignmentSerializer(serializers.Serializer):
+    mentee = serializers.CharField()
+    mentor = serializers.CharField(allow_null=True)
+
+
+class MentorshipCohortSerializer(serializers.Serializer):
+    mentor = serializers.CharField(allow_null=True)
+    mentees = serializers.ListField(child=serializers.CharField())
+
+
+class MentorshipErrorSerializer(serializers.Serializer):
+    mentee = serializers.CharField()
+    mentor = serializers.CharField(allow_null=True)
+    error = serializers.CharField()
+
+
+class BulkMentorshipResultSerializer(serializers.Serializer):
+    updated = serializers.IntegerField()
+    errors = MentorshipErrorSerializer(many=True)
+
+
+class BulkMentorshipSerializer(serializers.Serializer):
+    assignments = MentorshipAssignmentSerializer(many=True, required=False)
+    cohorts = MentorshipCohortSerializer(many=True, required=False)
+
+    def validate(self, attrs):
+        pairs = [
+            (item["mentee"], item["mentor"]) for item in attrs.get("assignments", [])
+        ]
+        for cohort in attrs.get("cohorts", []):
+            pairs += [(mentee, cohort["mentor"]) for mentee in cohort["mentees"]]
+        if not pairs:
+            raise serializers.ValidationError("Назначения не указаны")
+        return {"pairs": pairs}
+
+    def create(self, validated_data):
+        pairs = validated_data["pairs"]
+        usernames = {name for pair in pairs for name in pair if name}
+        errors = []
+        changed = {}
+        previous = {}
+
+        with transaction.atomic():
+            users = {
+                user.username: user
+                for user in User.objects.select_for_update()
+                .filter(username__in=usernames)
+                .only("id", "username", "mentor_id")
+            }
+            seen = set()
+            for mentee_name, mentor_name in pairs:
+                mentee = users.get(mentee_name)
+                mentor = users.get(mentor_name) if mentor_name else None
+                if mentee is None:
+                    error = "Менти не найден"
+                elif mentor_name and mentor is None:
+                    error = "Ментор не найден"
+                elif mentor is not None and mentor.pk == mentee.pk:
+                    error = "Пользователь не может быть своим ментором"
+                elif mentee_name in seen:
+                    error = "Менти указан несколько раз"
+                else:
+                    error = None
+                if error:
+                    errors.append(
+                        {"mentee": mentee_name, "mentor": mentor_name, "error": error}
+                    )
+                    continue
+
+                seen.add(mentee_name)
+                mentor_id = mentor.pk if mentor else None
+                if mentee.mentor_id != mentor_id:
+                    previous[mentee.pk] = (mentee.mentor_id, mentor_name)
+                    mentee.mentor_id = mentor_id
+                    changed[mentee.pk] = mentee
+
+            User.objects.bulk_update(changed.values(), ["mentor"], batch_size=1000)
+
+            # Назначения, замкнувшие цикл, откатываются до прежнего ментора
+            cyclic = users_in_cycles(changed)
+            while cyclic:
+                reverted = [changed.pop(pk) for pk in cyclic]
+                for mentee in reverted:
+                    mentee.mentor_id, mentor_name = previous[mentee.pk]
+                    errors.append(
+                        {
+                            "mentee": mentee.username,
+                            "mentor": mentor_name,
+                            "error": "Назначение создает цикл наставничества",
+                        }
+                    )
+                User.objects.bulk_update(reverted, ["mentor"])
+                cyclic = users_in_cycles(changed)
+
+            # Версия и время изменения (после ожидания блокировок, иначе строки
+            # оказались бы позади курсора ленты изменений) меняются только
+            # у оставшихся назначений, их прежних и новых менторов
+            mentors = {previous[pk][0] for pk in changed}
+            mentors |= {mentee.mentor_id for mentee in changed.values()}
+            User.objects.touch_ids(changed.keys() | mentors)
+
+        return {"updated": len(changed), "errors": errors}
@@ -0,0 +1,28 @@
+from django.contrib.auth import get_user_model
+from django.db.backends.signals import connection_created
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .authentication import user_cache
+from .caches import invalidate_user_details
+from .middleware import install_query_counter
+
+User = get_user_model()
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_cache(sender, instance, **kwargs):
+    user_cache.delete(str(instance.pk))
+    invalidate_user_details([instance.pk])
+
+
+@receiver(pre_delete, sender=User)
+def touch_related_users(sender, instance, **kwargs):
+    User.objects.filter(Q(pk=instance.mentor_id) | Q(mentor=instance)).touch()
+
+
+@receiver(connection_created)
+def install_query_counter_on_connect(sender, connection, **kwargs):
+    # Подключения потоков исполнителя sync_to_async открываются вне middleware
+    install_query_counter(connection)
@@ -0,0 +1,15 @@
+class QueryBudgetTestMixin:
+    """Проверки бюджета запросов к БД по данным QueryBudgetMiddleware."""
+
+    def assertQueryBudget(self, response):
+        self.assertIsNotNone(
+            response.query_budget,
+            f"У представления {response.wsgi_request.path} не задан query_budget",
+        )
+        self.assertLessEqual(
+            response.db_queries,
+            response.query_budget,
+            f"{response.wsgi_request.method} {response.wsgi_request.path}: "
+            f"{response.db_queries} запросов к БД при бюджете "
+            f"{response.query_budget}",
+        )
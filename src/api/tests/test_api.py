@@ -1,12 +1,82 @@
-from django.contrib.auth import get_user_model
-from django.urls import reverse
+import base64
+import csv
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from contextlib import ExitStack
+from datetime import timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock, skipIf
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model, hashers
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.http import HttpResponse
+from django.test import (
+    AsyncClient,
+    AsyncRequestFactory,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+)
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import include, path, reverse
+from django.utils import timezone
+from drf_spectacular.generators import SchemaGenerator
+from prometheus_client import REGISTRY
 from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken,
+    OutstandingToken,
+)
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api import hashing
+from api.async_views import AsyncUserDetailView, AsyncUserListView
+from api.authentication import user_cache
+from api.blacklist import BlacklistFilter, BloomFilter, blacklist_filter
+from api.caches import set_user_detail
+from api.hashing import HashingPool
+from api.last_login import last_login_buffer
+from api.metrics import metrics_view, record_pool_stats
+from api.pruning import prune_expired_tokens
+from api.replicas import (
+    MARKER_CACHE,
+    ReplicaMiddleware,
+    ReplicaRouter,
+    read_alias,
+    stick_after_write,
+)
+from api.serializers import UserDetailSerializer, UserListSerializer
+from api.tests.helpers import QueryBudgetTestMixin
+from api.views import user_detail_queryset, user_list_queryset
+from core.config import config
+
+try:
+    from api.parsers import ORJSONParser
+    from api.renderers import ORJSONRenderer
+except ImportError:
+    ORJSONParser = ORJSONRenderer = None
 
 User = get_user_model()
 
 
-class TestUrls(APITestCase):
+class TestUrls(QueryBudgetTestMixin, APITestCase):
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
@@ -17,6 +87,13 @@ class TestUrls(APITestCase):
             "logout": reverse("api:token_blacklist"),
             "users": reverse("api:users-list"),
             "user_detail": lambda user_id: reverse("api:users-detail", args=[user_id]),
+            "mentorship": reverse("api:users-mentorship"),
+            "export": reverse("api:users-export"),
+            "changes": reverse("api:users-changes"),
+            "ancestors": lambda user_id: reverse("api:users-ancestors", args=[user_id]),
+            "descendants": lambda user_id: reverse(
+                "api:users-descendants", args=[user_id]
+            ),
         }
 
         cls.test_user = User.objects.create_user(
@@ -50,6 +127,7 @@ class TestUrls(APITestCase):
 
     def setUp(self):
         super().setUp()
+        cache.clear()
         response = self.client.post(
             self.urls["login"],
             {
@@ -64,6 +142,14 @@ class TestUrls(APITestCase):
             HTTP_AUTHORIZATION=f"Bearer {self.access_token}"
         )
 
+    def _login(self, user, password="testpass123"):
+        response = self.client.post(
+            self.urls["login"],
+            {"username": user.username, "password": password},
+            format="json",
+        )
+        return response.data["access"]
+
     def test_registration_success(self):
         initial_count = User.objects.count()
         payload = {
@@ -115,6 +201,56 @@ class TestUrls(APITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
+    def test_login_rejected_when_hashing_saturated(self):
+        with mock.patch.object(hashing, "hashing_pool", HashingPool(0, 0)):
+            response = self.client.post(
+                self.urls["login"],
+                {"username": self.test_user.username, "password": "testpassword"},
+                format="json",
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response["Retry-After"], "1")
+
+    def test_login_with_unusable_password_runs_hash(self):
+        user = User.objects.get(pk=self.mentee1.pk)
+        user.set_unusable_password()
+        user.save(update_fields=["password"])
+        make_password = hashers.make_password
+
+        # Время ответа не должно выдавать учетные записи без пароля
+        with (
+            mock.patch.object(hashing, "hashing_pool", HashingPool(0, 8)),
+            mock.patch.object(
+                hashers, "make_password", wraps=make_password
+            ) as fake_hash,
+        ):
+            response = self.client.post(
+                self.urls["login"],
+                {"username": user.username, "password": "testpass123"},
+                format="json",
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        fake_hash.assert_called_once()
+
+    def test_password_rehashed_on_login(self):
+        user = User.objects.get(pk=self.mentee1.pk)
+        version = user.version
+
+        # Настройки переопределяются только в текущем процессе, поэтому пул
+        # выполняет хэширование в потоке запроса
+        with (
+            override_settings(PASSWORD_HASH_ITERATIONS=1000),
+            mock.patch.object(hashing, "hashing_pool", HashingPool(0, 8)),
+        ):
+            self._login(user)
+
+        user.refresh_from_db()
+        self.assertEqual(user.password.split("$")[1], "1000")
+        self.assertTrue(user.check_password("testpass123"))
+        self.assertEqual(user.version, version)
+
     def test_refresh_token_success(self):
         payload = {
             "refresh": self.refresh_token,
@@ -151,6 +287,138 @@ class TestUrls(APITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
+    def test_views_within_query_budgets(self):
+        mentor_client = APIClient()
+        mentor_client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {self._login(self.user_with_mentees)}"
+        )
+        mentor_id = self.user_with_mentees.pk
+        requests = [
+            lambda: self.client.post(
+                self.urls["registration"],
+                {"username": "budget_user", "password": "testpass123"},
+                format="json",
+            ),
+            lambda: self.client.post(
+                self.urls["login"],
+                {"username": "test_user", "password": "testpassword"},
+                format="json",
+            ),
+            lambda: self.client.post(
+                self.urls["refresh"], {"refresh": self.refresh_token}, format="json"
+            ),
+            lambda: self.test_user_client.get(self.urls["users"]),
+            lambda: self.test_user_client.get(
+                f"{self.urls['users']}?pagination=cursor"
+            ),
+            lambda: mentor_client.get(self.urls["user_detail"](mentor_id)),
+            lambda: mentor_client.patch(
+                self.urls["user_detail"](mentor_id),
+                {"email": "mentor@example.com"},
+                format="json",
+            ),
+            lambda: mentor_client.patch(
+                self.urls["user_detail"](mentor_id),
+                {"mentees": ["mentee2", "has_mentor"]},
+                format="json",
+            ),
+            lambda: mentor_client.patch(
+                self.urls["user_detail"](mentor_id),
+                {"mentor": "test_user", "mentees": ["mentee1", "has_both"]},
+                format="json",
+            ),
+            lambda: mentor_client.get(self.urls["ancestors"](self.mentee1.pk)),
+            lambda: mentor_client.get(self.urls["changes"]),
+            lambda: mentor_client.get(self.urls["descendants"](mentor_id)),
+            lambda: self.client.post(
+                self.urls["logout"],
+                {"refresh": self._login_refresh()},
+                format="json",
+            ),
+        ]
+        for request in requests:
+            # Худший случай: ни пользователь из токена, ни профиль не в кэше
+            cache.clear()
+            user_cache.clear()
+            response = request()
+            with self.subTest(path=response.wsgi_request.path):
+                self.assertLess(response.status_code, 400)
+                self.assertQueryBudget(response)
+
+    def _login_refresh(self):
+        response = self.client.post(
+            self.urls["login"],
+            {"username": "test_user", "password": "testpassword"},
+            format="json",
+        )
+        return response.data["refresh"]
+
+    def test_query_budget_exceeded_is_logged(self):
+        with (
+            mock.patch("api.views.UserListView.query_budget", 1),
+            self.assertLogs("api.middleware", "WARNING") as logs,
+        ):
+            user_cache.clear()
+            response = self.test_user_client.get(self.urls["users"])
+
+        self.assertEqual(response.db_queries, 3)
+        self.assertIn("made 3 queries, budget 1", logs.output[0])
+
+    @override_settings(SERVER_TIMING=True)
+    def test_server_timing_header(self):
+        response = self.test_user_client.get(self.urls["users"])
+
+        self.assertRegex(
+            response["Server-Timing"],
+            rf'^db;desc="{response.db_queries} queries";dur=[\d.]+, total;dur=[\d.]+$',
+        )
+
+    def test_server_timing_header_disabled_by_default(self):
+        response = self.test_user_client.get(self.urls["users"])
+
+        self.assertNotIn("Server-Timing", response)
+
+    def test_authentication_uses_user_cache(self):
+        self.test_user_client.get(self.urls["users"])
+
+        # Только COUNT и выборка страницы, без запроса пользователя из токена
+        with self.assertNumQueries(2):
+            response = self.test_user_client.get(self.urls["users"])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_deactivated_user_is_rejected_despite_cache(self):
+        self.test_user_client.get(self.urls["users"])
+
+        self.test_user.is_active = False
+        self.test_user.save()
+
+        response = self.test_user_client.get(self.urls["users"])
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_token_reuse_failure(self):
+        payload = {
+            "refresh": self.refresh_token,
+        }
+        self.client.post(self.urls["refresh"], payload, format="json")
+
+        response = self.client.post(self.urls["refresh"], payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_token_reuse_failure_with_stale_filter(self):
+        payload = {
+            "refresh": self.refresh_token,
+        }
+        self.client.post(self.urls["refresh"], payload, format="json")
+
+        # Фильтр другого воркера еще не знает о блокировке токена
+        with mock.patch.object(blacklist_filter, "might_contain", return_value=False):
+            response = self.client.post(self.urls["refresh"], payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
     def test_user_list_success(self):
         initial_count = User.objects.count()
         mentor_count = User.objects.filter(mentees__isnull=False).distinct().count()
@@ -182,6 +450,22 @@ class TestUrls(APITestCase):
             mentor_count,
         )
 
+    def test_user_list_queries_do_not_depend_on_mentees(self):
+        self.test_user_client.get(self.urls["users"])
+        with CaptureQueriesContext(connection) as before:
+            self.test_user_client.get(self.urls["users"])
+
+        for i in range(5):
+            User.objects.create(username=f"extra_mentee{i}", mentor=self.test_user)
+
+        with self.assertNumQueries(len(before.captured_queries)):
+            response = self.test_user_client.get(self.urls["users"])
+
+        test_user = next(
+            user for user in response.data["results"] if user["id"] == self.test_user.id
+        )
+        self.assertTrue(test_user["is_mentor"])
+
     def test_user_detail_success(self):
         user_id = self.test_user.id
 
@@ -192,6 +476,63 @@ class TestUrls(APITestCase):
         self.assertNotIn("mentor", response.data)
         self.assertNotIn("mentees", response.data)
 
+    def test_user_detail_sparse_fieldset(self):
+        url = self.urls["user_detail"](self.user_with_both.id)
+        self.test_user_client.get(self.urls["users"])
+
+        # Без ментора и менти: один запрос без JOIN и prefetch
+        with CaptureQueriesContext(connection) as queries:
+            response = self.test_user_client.get(url, {"fields": "id,username"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data,
+            {"id": self.user_with_both.id, "username": self.user_with_both.username},
+        )
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("JOIN", queries[0]["sql"])
+        self.assertNotIn('"email"', queries[0]["sql"])
+
+        with self.assertNumQueries(2):
+            response = self.test_user_client.get(url, {"omit": "email,mentor"})
+
+        self.assertEqual(
+            set(response.data), {"id", "username", "phone_number", "mentees"}
+        )
+        self.assertEqual(response.data["mentees"], [self.mentee1.username])
+
+    def test_user_detail_sparse_fieldset_from_cache(self):
+        url = self.urls["user_detail"](self.user_with_both.id)
+        full = self.test_user_client.get(url).data
+
+        with self.assertNumQueries(0):
+            response = self.test_user_client.get(url, {"fields": "username,mentor"})
+
+        self.assertEqual(
+            response.data, {"username": full["username"], "mentor": full["mentor"]}
+        )
+
+    def test_user_list_sparse_fieldset(self):
+        self.test_user_client.get(self.urls["users"])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.test_user_client.get(self.urls["users"], {"fields": "id"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data["results"][0]), {"id"})
+        self.assertFalse(any("EXISTS" in query["sql"] for query in queries))
+
+    def test_invalid_sparse_fieldset(self):
+        url = self.urls["user_detail"](self.test_user.id)
+        for params in (
+            {"fields": "id,password"},
+            {"omit": "unknown"},
+            {"fields": "id", "omit": "username"},
+        ):
+            response = self.test_user_client.get(url, params)
+
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_user_with_mentor_detail_success(self):
         user_id = self.user_with_mentor.id
         mentor_username = self.user_with_mentor.mentor.username
@@ -243,6 +584,85 @@ class TestUrls(APITestCase):
             sorted(mentees_usernames),
         )
 
+    def test_user_detail_not_modified(self):
+        url = self.urls["user_detail"](self.user_with_mentees.id)
+        etag = self.test_user_client.get(url)["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.test_user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+        self.assertFalse(response.content)
+
+    def test_user_detail_served_from_cache(self):
+        url = self.urls["user_detail"](self.user_with_both.id)
+        expected = self.test_user_client.get(url).data
+
+        with self.assertNumQueries(0):
+            response = self.test_user_client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, expected)
+
+    def test_user_detail_cache_invalidated_on_mentor_change(self):
+        old_mentor_url = self.urls["user_detail"](self.user_with_mentees.id)
+        new_mentor_url = self.urls["user_detail"](self.user_with_both.id)
+        self.test_user_client.get(old_mentor_url)
+        self.test_user_client.get(new_mentor_url)
+
+        mentee = User.objects.get(pk=self.user_with_mentor.pk)
+        mentee.mentor = self.user_with_both
+        mentee.save()
+
+        old_mentor = self.test_user_client.get(old_mentor_url).data
+        new_mentor = self.test_user_client.get(new_mentor_url).data
+        self.assertNotIn(mentee.username, old_mentor["mentees"])
+        self.assertIn(mentee.username, new_mentor["mentees"])
+
+    def test_mentor_etag_changes_when_mentee_joins(self):
+        url = self.urls["user_detail"](self.user_with_mentees.id)
+        etag = self.test_user_client.get(url)["ETag"]
+
+        self.test_user_client.patch(
+            self.urls["user_detail"](self.test_user.id),
+            {"mentor": self.user_with_mentees.username},
+            format="json",
+        )
+        response = self.test_user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertIn(self.test_user.username, response.data["mentees"])
+
+    def test_mentee_etag_changes_when_reassigned(self):
+        url = self.urls["user_detail"](self.mentee2.id)
+        etag = self.test_user_client.get(url)["ETag"]
+
+        self.test_user_client.patch(
+            self.urls["user_detail"](self.test_user.id),
+            {"mentees": [self.mentee2.username]},
+            format="json",
+        )
+        response = self.test_user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["mentor"], self.test_user.username)
+
+    def test_user_list_not_modified(self):
+        etag = self.test_user_client.get(self.urls["users"])["ETag"]
+
+        response = self.test_user_client.get(
+            self.urls["users"], HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        User.objects.create(username="new_mentee", mentor=self.test_user)
+        response = self.test_user_client.get(
+            self.urls["users"], HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
     def test_user_update_success(self):
         user_id = self.test_user.id
         payload = {
@@ -344,6 +764,236 @@ class TestUrls(APITestCase):
         other_user.refresh_from_db()
         self.assertEqual(other_user.username, "other_user")
 
+    def test_bulk_mentorship_success(self):
+        admin = User.objects.create_user(username="admin", is_staff=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+        payload = {
+            "assignments": [
+                {"mentee": self.test_user.username, "mentor": self.mentee1.username},
+                {"mentee": self.user_with_mentor.username, "mentor": None},
+                {"mentee": "nonexistent_user", "mentor": self.mentee1.username},
+            ],
+            "cohorts": [
+                {
+                    "mentor": self.mentee2.username,
+                    "mentees": [self.user_with_both.username, self.mentee2.username],
+                },
+            ],
+        }
+
+        with self.assertNumQueries(7):
+            response = client.post(self.urls["mentorship"], payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["updated"], 3)
+        self.assertEqual(
+            [error["mentee"] for error in response.data["errors"]],
+            ["nonexistent_user", self.mentee2.username],
+        )
+        self.assertEqual(
+            dict(
+                User.objects.filter(
+                    pk__in=[
+                        self.test_user.pk,
+                        self.user_with_mentor.pk,
+                        self.user_with_both.pk,
+                    ]
+                ).values_list("username", "mentor__username")
+            ),
+            {
+                self.test_user.username: self.mentee1.username,
+                self.user_with_mentor.username: None,
+                self.user_with_both.username: self.mentee2.username,
+            },
+        )
+
+    def test_bulk_mentorship_forbidden_for_regular_user(self):
+        payload = {"assignments": [{"mentee": "mentee1", "mentor": "test_user"}]}
+
+        response = self.test_user_client.post(
+            self.urls["mentorship"], payload, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_user_export_ndjson(self):
+        admin = User.objects.create_user(username="admin", is_staff=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        response = client.get(self.urls["export"])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            response["Content-Type"], "application/x-ndjson; charset=utf-8"
+        )
+        rows = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).decode().splitlines()
+        ]
+        self.assertEqual(len(rows), User.objects.count())
+        self.assertEqual(
+            [row["id"] for row in rows],
+            list(User.objects.order_by("id").values_list("id", flat=True)),
+        )
+        by_username = {row["username"]: row for row in rows}
+        self.assertEqual(
+            by_username[self.user_with_both.username],
+            {
+                "id": self.user_with_both.pk,
+                "username": self.user_with_both.username,
+                "email": "",
+                "phone_number": None,
+                "mentor": self.user_with_mentees.username,
+                "is_mentor": True,
+            },
+        )
+        self.assertFalse(by_username[self.test_user.username]["is_mentor"])
+
+    @override_settings(USER_EXPORT_BUFFER_SIZE=64)
+    def test_user_export_streams_under_asgi(self):
+        admin = User.objects.create_user(username="admin", is_staff=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+        expected = b"".join(client.get(self.urls["export"]).streaming_content)
+
+        async def export():
+            response = await AsyncClient().get(
+                self.urls["export"],
+                headers={"Authorization": f"Bearer {AccessToken.for_user(admin)}"},
+            )
+            blocks = [block async for block in response.streaming_content]
+            return response, blocks
+
+        response, blocks = async_to_sync(export)()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Блоки отдаются по мере чтения, а не одним списком
+        self.assertTrue(response.is_async)
+        self.assertGreater(len(blocks), 1)
+        self.assertEqual(b"".join(blocks), expected)
+
+    def test_user_export_csv(self):
+        admin = User.objects.create_user(username="admin", is_staff=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        response = client.get(self.urls["export"], {"output": "csv"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        rows = list(
+            csv.DictReader(StringIO(b"".join(response.streaming_content).decode()))
+        )
+        self.assertEqual(len(rows), User.objects.count())
+        by_username = {row["username"]: row for row in rows}
+        self.assertEqual(
+            by_username[self.user_with_mentor.username]["mentor"],
+            self.user_with_mentees.username,
+        )
+        self.assertEqual(by_username[self.user_with_mentees.username]["mentor"], "")
+
+    def test_user_export_invalid_format(self):
+        admin = User.objects.create_user(username="admin", is_staff=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        response = client.get(self.urls["export"], {"output": "xml"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_user_export_forbidden_for_regular_user(self):
+        response = self.test_user_client.get(self.urls["export"])
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_user_ancestors_success(self):
+        User.objects.filter(pk=self.user_with_mentees.pk).update(mentor=self.test_user)
+
+        url = self.urls["ancestors"](self.user_with_both.id)
+        self.test_user_client.get(url)
+
+        # Проверка существования пользователя и один рекурсивный запрос
+        with self.assertNumQueries(2):
+            response = self.test_user_client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(user["username"], user["depth"]) for user in response.data["results"]],
+            [("has_mentees", 1), ("test_user", 2)],
+        )
+
+    def test_user_descendants_depth_and_paging(self):
+        url = self.urls["descendants"](self.user_with_mentees.id)
+
+        response = self.test_user_client.get(url, {"depth": 1})
+        self.assertEqual(
+            {user["username"] for user in response.data["results"]},
+            {"mentee2", "has_mentor", "has_both"},
+        )
+
+        response = self.test_user_client.get(url, {"limit": 3})
+        self.assertEqual(
+            [user["depth"] for user in response.data["results"]], [1, 1, 1]
+        )
+        self.assertIsNotNone(response.data["next"])
+
+        response = self.test_user_client.get(response.data["next"])
+        self.assertEqual(
+            [(user["username"], user["depth"]) for user in response.data["results"]],
+            [("mentee1", 2)],
+        )
+        self.assertIsNone(response.data["next"])
+
+    def test_set_mentor_cycle_rejected(self):
+        payload = {"mentor": self.user_with_both.username}
+
+        response = self.client.patch(
+            self.urls["user_detail"](self.user_with_mentees.id),
+            payload,
+            format="json",
+            HTTP_AUTHORIZATION=f"Bearer {self._login(self.user_with_mentees)}",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIsNone(User.objects.get(pk=self.user_with_mentees.pk).mentor)
+
+    def test_set_mentees_cycle_rejected(self):
+        User.objects.filter(pk=self.test_user.pk).update(mentor=self.mentee1)
+
+        response = self.test_user_client.patch(
+            self.urls["user_detail"](self.test_user.id),
+            {"mentees": [self.mentee1.username]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_mentorship_cycle_rejected(self):
+        admin = User.objects.create_user(username="admin", is_staff=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+        payload = {
+            "assignments": [
+                {"mentee": self.test_user.username, "mentor": self.mentee2.username},
+                {"mentee": self.mentee2.username, "mentor": self.test_user.username},
+            ],
+        }
+        versions = dict(User.objects.values_list("pk", "version"))
+
+        response = client.post(self.urls["mentorship"], payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["updated"], 0)
+        self.assertEqual(len(response.data["errors"]), 2)
+        self.assertEqual(
+            User.objects.get(pk=self.mentee2.pk).mentor_id, self.user_with_mentees.pk
+        )
+        # Откаченные назначения не меняют ETag и не попадают в ленту изменений
+        self.assertEqual(dict(User.objects.values_list("pk", "version")), versions)
+
     def test_set_nonexistent_mentor(self):
         payload = {"mentor": "nonexistent_user"}
 
@@ -352,3 +1002,1199 @@ class TestUrls(APITestCase):
         )
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_set_nonexistent_mentees(self):
+        response = self.test_user_client.patch(
+            self.urls["user_detail"](self.test_user.id),
+            {"mentees": [self.mentee1.username, "ghost2", "ghost1"]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("Пользователи не найдены: ghost1, ghost2", str(response.data))
+        self.assertFalse(User.objects.filter(mentor=self.test_user).exists())
+
+    def test_mentees_update_statements_do_not_depend_on_cohort(self):
+        cohort = User.objects.bulk_create(
+            User(username=f"cohort_{i}", mentor=self.mentee1) for i in range(50)
+        )
+        User.objects.filter(pk__in=[self.mentee2.pk, cohort[0].pk]).update(
+            mentor=self.test_user
+        )
+        usernames = [user.username for user in cohort[1:]]
+        versions = dict(User.objects.values_list("pk", "version"))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.test_user_client.patch(
+                self.urls["user_detail"](self.test_user.id),
+                {"mentees": usernames},
+                format="json",
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertCountEqual(response.data["mentees"], usernames)
+        updates = [q for q in queries if q["sql"].startswith("UPDATE")]
+        # Добавленные, удаленные, их прежний ментор и сам пользователь
+        self.assertEqual(len(updates), 4)
+        bumped = {
+            pk
+            for pk, version in User.objects.values_list("pk", "version")
+            if version != versions[pk]
+        }
+        self.assertEqual(
+            bumped,
+            {
+                self.test_user.pk,
+                self.mentee1.pk,
+                self.mentee2.pk,
+                cohort[0].pk,
+                *(user.pk for user in cohort[1:]),
+            },
+        )
+
+    def test_password_change_keeps_version(self):
+        version = User.objects.get(pk=self.test_user.pk).version
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.test_user_client.patch(
+                self.urls["user_detail"](self.test_user.id),
+                {"old_password": "testpassword", "new_password": "newpassword"},
+                format="json",
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        updates = [q["sql"] for q in queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn("version", updates[0])
+        self.assertEqual(User.objects.get(pk=self.test_user.pk).version, version)
+
+    def test_unchanged_update_keeps_etag(self):
+        url = self.urls["user_detail"](self.test_user.id)
+        etag = self.test_user_client.get(url)["ETag"]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.test_user_client.patch(
+                url, {"username": self.test_user.username, "mentees": []}, format="json"
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse([q for q in queries if q["sql"].startswith("UPDATE")])
+        response = self.test_user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_user_list_cursor_pagination(self):
+        ids = list(User.objects.order_by("id").values_list("id", flat=True))
+
+        response = self.test_user_client.get(
+            self.urls["users"], {"pagination": "cursor", "limit": 2}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn("count", response.data)
+        self.assertIsNone(response.data["previous"])
+        self.assertEqual([user["id"] for user in response.data["results"]], ids[:2])
+
+        collected = [user["id"] for user in response.data["results"]]
+        next_url = response.data["next"]
+        while next_url:
+            response = self.test_user_client.get(next_url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            collected += [user["id"] for user in response.data["results"]]
+            next_url = response.data["next"]
+
+        self.assertEqual(collected, ids)
+
+    def _list_usernames(self, params):
+        response = self.test_user_client.get(self.urls["users"], params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {user["username"] for user in response.data["results"]}
+
+    def test_user_list_search(self):
+        User.objects.create_user(username="zeta", email="Has.Email@example.com")
+
+        self.assertEqual(
+            self._list_usernames({"search": "HAS_"}),
+            {"has_mentees", "has_mentor", "has_both"},
+        )
+        self.assertEqual(
+            self._list_usernames({"search": "has"}),
+            {"has_mentees", "has_mentor", "has_both", "zeta"},
+        )
+        self.assertEqual(self._list_usernames({"search": "%"}), set())
+
+    def test_user_list_filters(self):
+        self.assertEqual(
+            self._list_usernames({"mentor": self.user_with_mentees.pk}),
+            {"has_mentor", "has_both", "mentee2"},
+        )
+        self.assertEqual(
+            self._list_usernames({"is_mentor": "true"}), {"has_mentees", "has_both"}
+        )
+        self.assertEqual(
+            self._list_usernames({"is_mentor": "false", "has_mentor": "false"}),
+            {"test_user"},
+        )
+        self.assertEqual(
+            self._list_usernames({"has_mentor": "true", "search": "mentee"}),
+            {"mentee1", "mentee2"},
+        )
+
+    def test_user_list_invalid_filters(self):
+        for params in ({"mentor": "abc"}, {"is_mentor": "maybe"}):
+            response = self.test_user_client.get(self.urls["users"], params)
+
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(next(iter(params)), response.data)
+
+    def _sync_changes(self, cursor=None, limit=None):
+        # Все страницы изменений после cursor: строки и курсор для продолжения
+        results = []
+        while True:
+            params = {"since": cursor} if cursor else {}
+            if limit:
+                params["limit"] = limit
+            response = self.test_user_client.get(self.urls["changes"], params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            results += response.data["results"]
+            cursor = response.data["cursor"]
+            if not response.data["has_more"]:
+                return {user["username"]: user for user in results}, cursor
+
+    @override_settings(USER_CHANGES_SETTLE_SECONDS=0)
+    def test_user_changes_sync(self):
+        users, cursor = self._sync_changes(limit=4)
+        self.assertCountEqual(users, User.objects.values_list("username", flat=True))
+        self.assertEqual(users["mentee1"]["mentor"], self.user_with_both.username)
+        self.assertTrue(users["has_mentees"]["is_mentor"])
+
+        self.assertEqual(self._sync_changes(cursor), ({}, cursor))
+
+        self.test_user_client.patch(
+            self.urls["user_detail"](self.test_user.id),
+            {"mentees": [self.mentee2.username]},
+            format="json",
+        )
+        deactivated = User.objects.get(pk=self.user_with_mentor.pk)
+        deactivated.is_active = False
+        deactivated.save(update_fields=["is_active"])
+        User.objects.create_user(username="new_user")
+
+        users, cursor = self._sync_changes(cursor)
+
+        self.assertEqual(
+            set(users),
+            {"test_user", "mentee2", "has_mentees", "has_mentor", "new_user"},
+        )
+        self.assertEqual(users["mentee2"]["mentor"], self.test_user.username)
+        self.assertTrue(users["test_user"]["is_mentor"])
+        self.assertFalse(users["has_mentor"]["is_active"])
+        self.assertEqual(self._sync_changes(cursor), ({}, cursor))
+
+    @override_settings(USER_CHANGES_SETTLE_SECONDS=0)
+    def test_user_changes_after_bulk_mentorship(self):
+        _, cursor = self._sync_changes()
+        admin = User.objects.create_user(username="admin", is_staff=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        client.post(
+            self.urls["mentorship"],
+            {"cohorts": [{"mentor": "test_user", "mentees": ["mentee1"]}]},
+            format="json",
+        )
+        users, _ = self._sync_changes(cursor)
+
+        self.assertEqual(set(users), {"admin", "test_user", "mentee1", "has_both"})
+
+    def test_bulk_mentorship_updated_at_follows_lock_wait(self):
+        admin = User.objects.create_user(username="admin", is_staff=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+        locked = []
+
+        def wait_for_lock(execute, sql, params, many, context):
+            result = execute(sql, params, many, context)
+            if not locked and sql.startswith("SELECT") and '"username" IN' in sql:
+                # Блокировки строк заняты другой транзакцией
+                time.sleep(0.05)
+                locked.append(timezone.now())
+            return result
+
+        with connection.execute_wrapper(wait_for_lock):
+            client.post(
+                self.urls["mentorship"],
+                {"assignments": [{"mentee": "mentee2", "mentor": "test_user"}]},
+                format="json",
+            )
+
+        # Иначе строка закоммичена со временем, которое лента изменений
+        # могла уже пропустить за окном USER_CHANGES_SETTLE_SECONDS
+        self.assertGreaterEqual(
+            User.objects.get(pk=self.mentee2.pk).updated_at, locked[0]
+        )
+
+    def test_user_changes_wait_for_settle_window(self):
+        with override_settings(USER_CHANGES_SETTLE_SECONDS=0):
+            _, cursor = self._sync_changes()
+        User.objects.filter(pk=self.mentee1.pk).touch()
+
+        with override_settings(USER_CHANGES_SETTLE_SECONDS=60):
+            self.assertEqual(self._sync_changes(cursor), ({}, cursor))
+        with override_settings(USER_CHANGES_SETTLE_SECONDS=0):
+            users, _ = self._sync_changes(cursor)
+        self.assertEqual(set(users), {"mentee1"})
+
+    def test_user_changes_invalid_cursor(self):
+        naive = base64.urlsafe_b64encode(b"2026-01-01T00:00:00 1").decode()
+        for cursor in ("garbage", naive):
+            response = self.test_user_client.get(
+                self.urls["changes"], {"since": cursor}
+            )
+
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn("since", response.data)
+
+
+class TestCacheSettings(SimpleTestCase):
+    def test_tests_use_temporary_cache(self):
+        # cache.clear() в тестах не должен очищать кэш сервера
+        self.assertNotEqual(
+            settings.CACHES["default"]["LOCATION"], config.CACHE_LOCATION
+        )
+
+
+class TestSchema(SimpleTestCase):
+    def test_schema_declares_jwt_auth(self):
+        schema = SchemaGenerator().get_schema(request=None, public=True)
+
+        self.assertIn("jwtAuth", schema["components"]["securitySchemes"])
+        self.assertEqual(
+            schema["paths"]["/api/users/"]["get"]["security"], [{"jwtAuth": []}]
+        )
+
+
+class TestBloomFilter(SimpleTestCase):
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        values = [f"jti-{i}" for i in range(1000)]
+        for value in values:
+            bloom.add(value)
+
+        self.assertTrue(all(value in bloom for value in values))
+
+    def test_false_positive_rate(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f"jti-{i}")
+
+        false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+
+        self.assertLess(false_positives, 300)
+
+    def test_concurrent_requests_rebuild_once(self):
+        blacklist = BlacklistFilter(
+            capacity=10, error_rate=0.01, sync_interval=60, rebuild_interval=60
+        )
+
+        def slow_rebuild():
+            time.sleep(0.05)
+            blacklist._bloom = BloomFilter(capacity=10, error_rate=0.01)
+            blacklist._built_at = blacklist._synced_at = time.monotonic()
+
+        with mock.patch.object(
+            blacklist, "_rebuild", side_effect=slow_rebuild
+        ) as rebuild:
+            threads = [
+                threading.Thread(target=blacklist.might_contain, args=("jti",))
+                for _ in range(8)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        rebuild.assert_called_once()
+
+
+class TestPruneTokens(TestCase):
+    def test_prune_expired_tokens(self):
+        user = User.objects.create_user(username="pruned", password="testpass123")
+        now = timezone.now()
+        expired = [
+            OutstandingToken.objects.create(
+                user=user, jti=f"expired-{i}", token="", expires_at=now - timedelta(1)
+            )
+            for i in range(5)
+        ]
+        BlacklistedToken.objects.create(token=expired[0])
+        active = OutstandingToken.objects.create(
+            user=user, jti="active", token="", expires_at=now + timedelta(1)
+        )
+        BlacklistedToken.objects.create(token=active)
+        out = StringIO()
+
+        call_command("prunetokens", "--batch-size", "2", "--pause", "0", stdout=out)
+
+        self.assertEqual(list(OutstandingToken.objects.all()), [active])
+        self.assertEqual(BlacklistedToken.objects.count(), 1)
+        self.assertIn("Удалено токенов: 5", out.getvalue())
+        self.assertIn("из черного списка: 1", out.getvalue())
+
+
+@skipIf(
+    not connection.features.has_select_for_update_skip_locked,
+    "База не поддерживает SELECT ... FOR UPDATE SKIP LOCKED",
+)
+class TestConcurrentPruning(TransactionTestCase):
+    def test_prune_skips_tokens_locked_by_another_worker(self):
+        user = User.objects.create_user(username="pruned", password="testpass123")
+        expired = [
+            OutstandingToken.objects.create(
+                user=user,
+                jti=f"expired-{i}",
+                token="",
+                expires_at=timezone.now() - timedelta(1),
+            )
+            for i in range(4)
+        ]
+        locked = threading.Event()
+        release = threading.Event()
+
+        def hold_lock():
+            try:
+                with transaction.atomic():
+                    list(
+                        OutstandingToken.objects.select_for_update().filter(
+                            pk=expired[0].pk
+                        )
+                    )
+                    locked.set()
+                    release.wait(5)
+            finally:
+                connections.close_all()
+
+        worker = threading.Thread(target=hold_lock)
+        worker.start()
+        self.addCleanup(worker.join)
+        self.addCleanup(release.set)
+        self.assertTrue(locked.wait(5))
+
+        result = prune_expired_tokens(batch_size=2, pause=0)
+
+        self.assertEqual(result.outstanding, 3)
+        self.assertEqual(list(OutstandingToken.objects.all()), [expired[0]])
+
+
+@skipIf(
+    not connection.features.has_select_for_update,
+    "База не поддерживает SELECT ... FOR UPDATE",
+)
+class TestUpdatedAtAfterLockWait(TransactionTestCase):
+    """
+    Время изменения берется после ожидания блокировок: иначе строка
+    закоммичена со временем, которое лента изменений могла уже пропустить.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="user")
+        self.mentor = User.objects.create_user(username="mentor")
+        self.mentee = User.objects.create_user(username="mentee", mentor=self.mentor)
+        self.client = APIClient()
+
+    def hold_lock(self, user):
+        locked = threading.Event()
+        released = []
+
+        def hold():
+            try:
+                with transaction.atomic():
+                    list(User.objects.select_for_update().filter(pk=user.pk))
+                    locked.set()
+                    time.sleep(0.2)
+                    released.append(timezone.now())
+            finally:
+                connections.close_all()
+
+        worker = threading.Thread(target=hold)
+        worker.start()
+        self.addCleanup(worker.join)
+        self.assertTrue(locked.wait(5))
+        return worker, released
+
+    def assertStampedAfter(self, released, *users):
+        for user in users:
+            with self.subTest(user=user.username):
+                self.assertGreaterEqual(
+                    User.objects.get(pk=user.pk).updated_at, released[0]
+                )
+
+    def test_profile_update_waits_for_own_row(self):
+        self.client.force_authenticate(self.user)
+        worker, released = self.hold_lock(self.user)
+
+        self.client.patch(
+            reverse("api:users-detail", args=[self.user.pk]),
+            {"email": "user@example.com"},
+            format="json",
+        )
+
+        worker.join()
+        self.assertStampedAfter(released, self.user)
+
+    def test_mentor_change_waits_for_new_mentor(self):
+        self.client.force_authenticate(self.user)
+        worker, released = self.hold_lock(self.mentor)
+
+        self.client.patch(
+            reverse("api:users-detail", args=[self.user.pk]),
+            {"mentor": "mentor"},
+            format="json",
+        )
+
+        worker.join()
+        self.assertStampedAfter(released, self.user, self.mentor)
+
+    def test_mentees_change_waits_for_previous_mentor(self):
+        self.client.force_authenticate(self.user)
+        worker, released = self.hold_lock(self.mentor)
+
+        self.client.patch(
+            reverse("api:users-detail", args=[self.user.pk]),
+            {"mentees": ["mentee"]},
+            format="json",
+        )
+
+        worker.join()
+        self.assertStampedAfter(released, self.user, self.mentee, self.mentor)
+
+    def test_bulk_mentorship_waits_for_previous_mentor(self):
+        admin = User.objects.create_user(username="admin", is_staff=True)
+        self.client.force_authenticate(admin)
+        worker, released = self.hold_lock(self.mentor)
+
+        self.client.post(
+            reverse("api:users-mentorship"),
+            {"assignments": [{"mentee": "mentee", "mentor": "user"}]},
+            format="json",
+        )
+
+        worker.join()
+        self.assertStampedAfter(released, self.user, self.mentee, self.mentor)
+
+
+class TestLastLoginBuffer(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="buffered", password="pass")
+        self.addCleanup(last_login_buffer.flush)
+
+    def test_login_defers_last_login(self):
+        # simplejwt не перечитывает свои настройки в уже импортированных модулях
+        with (
+            override_settings(LAST_LOGIN_MAX_STALENESS=60),
+            mock.patch.object(jwt_serializers.api_settings, "UPDATE_LAST_LOGIN", False),
+        ):
+            response = APIClient().post(
+                reverse("api:token_obtain_pair"),
+                {"username": "buffered", "password": "pass"},
+                format="json",
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.last_login)
+        self.assertEqual(len(last_login_buffer), 1)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(last_login_buffer.flush(), 1)
+
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_login)
+        self.assertEqual(len(last_login_buffer), 0)
+
+    def test_flush_keeps_newer_value(self):
+        other = User.objects.create_user(username="other")
+        now = timezone.now()
+        User.objects.filter(pk=self.user.pk).update(last_login=now)
+        last_login_buffer.record(self.user.pk, now - timedelta(minutes=5))
+        last_login_buffer.record(other.pk, now - timedelta(minutes=5))
+        last_login_buffer.record(other.pk, now - timedelta(minutes=1))
+
+        self.assertEqual(last_login_buffer.flush(), 2)
+
+        self.user.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.user.last_login, now)
+        self.assertEqual(other.last_login, now - timedelta(minutes=1))
+
+
+class TestImportUsers(TestCase):
+    def _write(self, suffix, content):
+        path = Path(self.enterContext(TemporaryDirectory())) / f"users.{suffix}"
+        path.write_text(content, encoding="utf-8")
+        return path
+
+    def test_import_ndjson_and_resume(self):
+        mentor = User.objects.create_user(username="existing_mentor")
+        records = [
+            {"username": "imported1", "password": "pass-1", "mentor": "imported2"},
+            {"username": "imported2", "password": "pass-2", "email": "i2@example.com"},
+            {"username": "imported3", "mentor": mentor.username},
+            {"username": "imported1"},
+        ]
+        path = self._write(
+            "ndjson", "".join(json.dumps(record) + "\n" for record in records)
+        )
+        out = StringIO()
+
+        call_command(
+            "importusers",
+            path,
+            "--batch-size",
+            "2",
+            "--workers",
+            "2",
+            stdout=out,
+            stderr=StringIO(),
+        )
+
+        self.assertIn("Создано: 3", out.getvalue())
+        imported = {
+            user.username: user
+            for user in User.objects.filter(username__startswith="imported")
+        }
+        self.assertTrue(imported["imported1"].check_password("pass-1"))
+        self.assertFalse(imported["imported3"].has_usable_password())
+        self.assertEqual(imported["imported2"].email, "i2@example.com")
+        self.assertEqual(imported["imported1"].mentor, imported["imported2"])
+        self.assertEqual(imported["imported3"].mentor_id, mentor.pk)
+        mentor.refresh_from_db()
+        self.assertEqual(mentor.version, 2)
+
+        out = StringIO()
+        call_command("importusers", path, stdout=out, stderr=StringIO())
+
+        self.assertIn("Создано: 0, пропущено существующих: 3", out.getvalue())
+        self.assertIn("назначено менторов: 0", out.getvalue())
+
+    def test_import_csv_with_hashes_and_cycles(self):
+        password_hash = make_password("hashed-pass")
+        path = self._write(
+            "csv",
+            "username,password_hash,mentor,phone_number\n"
+            f"csv1,{password_hash},csv2,+79990000000\n"
+            "csv2,,csv1,\n"
+            "csv3,not-a-hash,,\n"
+            "csv4,,missing,\n",
+        )
+        err = StringIO()
+
+        call_command(
+            "importusers", path, "--workers", "0", stdout=StringIO(), stderr=err
+        )
+
+        users = {user.username: user for user in User.objects.all()}
+        self.assertEqual(set(users), {"csv1", "csv2", "csv4"})
+        self.assertTrue(users["csv1"].check_password("hashed-pass"))
+        self.assertEqual(users["csv1"].phone_number, "+79990000000")
+        self.assertIsNone(users["csv2"].phone_number)
+        # Оба назначения замыкают цикл и сбрасываются
+        self.assertIsNone(users["csv1"].mentor_id)
+        self.assertIsNone(users["csv2"].mentor_id)
+        self.assertIsNone(users["csv4"].mentor_id)
+        self.assertIn("csv1: Назначение создает цикл наставничества", err.getvalue())
+        self.assertIn("csv2: Назначение создает цикл наставничества", err.getvalue())
+        self.assertIn("csv3: Неизвестный формат хэша пароля", err.getvalue())
+        self.assertIn("csv4: Ментор не найден", err.getvalue())
+
+    def test_reimport_cycle_keeps_existing_mentor(self):
+        mentor = User.objects.create_user(username="old_mentor")
+        mentee = User.objects.create_user(username="mentee", mentor=mentor)
+        User.objects.create_user(username="child", mentor=mentee)
+        path = self._write(
+            "csv",
+            "username,mentor\nmentee,child\nloner,loner\n",
+        )
+        err = StringIO()
+
+        call_command(
+            "importusers", path, "--workers", "0", stdout=StringIO(), stderr=err
+        )
+
+        self.assertEqual(User.objects.get(pk=mentee.pk).mentor_id, mentor.pk)
+        self.assertIsNone(User.objects.get(username="loner").mentor_id)
+        self.assertIn("mentee: Назначение создает цикл наставничества", err.getvalue())
+        self.assertIn(
+            "loner: Пользователь не может быть своим ментором", err.getvalue()
+        )
+
+    def test_reimport_cycle_created_by_revert(self):
+        x = User.objects.create_user(username="x")
+        r = User.objects.create_user(username="r", mentor=x)
+        z = User.objects.create_user(username="z")
+        versions = dict(User.objects.values_list("pk", "version"))
+        path = self._write("csv", "username,mentor\nx,r\nr,z\nz,r\n")
+        err = StringIO()
+
+        call_command(
+            "importusers", path, "--workers", "0", stdout=StringIO(), stderr=err
+        )
+
+        self.assertEqual(
+            dict(User.objects.values_list("pk", "mentor_id")),
+            {x.pk: None, r.pk: x.pk, z.pk: None},
+        )
+        self.assertEqual(dict(User.objects.values_list("pk", "version")), versions)
+        for username in ("x", "r", "z"):
+            self.assertIn(
+                f"{username}: Назначение создает цикл наставничества", err.getvalue()
+            )
+
+
+class AsyncReadUrls:
+    # Маршруты чтения при ASYNC_READ_VIEWS=True
+    urlpatterns = [
+        path(
+            "api/",
+            include(
+                (
+                    [
+                        path("users/", AsyncUserListView.as_view(), name="users-list"),
+                        path(
+                            "users/<int:pk>/",
+                            AsyncUserDetailView.as_view(),
+                            name="users-detail",
+                        ),
+                    ],
+                    "api",
+                )
+            ),
+        )
+    ]
+
+
+class TestAsyncViews(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.mentor = User.objects.create_user(username="mentor", password="pass")
+        cls.mentee = User.objects.create_user(
+            username="mentee", password="pass", mentor=cls.mentor
+        )
+        cls.token = str(AccessToken.for_user(cls.mentor))
+
+    def setUp(self):
+        cache.clear()
+        self.factory = AsyncRequestFactory()
+        self.headers = {"Authorization": f"Bearer {self.token}"}
+
+    def sync_get(self, path):
+        return APIClient().get(path, headers=self.headers)
+
+    async def test_user_list_matches_sync_view(self):
+        path = reverse("api:users-list")
+        expected = await sync_to_async(self.sync_get)(path)
+
+        response = await AsyncUserListView.as_view()(
+            self.factory.get(path, headers=self.headers)
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content, expected.content)
+        self.assertEqual(response["ETag"], expected["ETag"])
+
+    async def test_user_detail_matches_sync_view(self):
+        path = reverse("api:users-detail", args=[self.mentor.pk])
+        expected = await sync_to_async(self.sync_get)(path)
+        await sync_to_async(cache.clear)()
+
+        response = await AsyncUserDetailView.as_view()(
+            self.factory.get(path, headers=self.headers), pk=self.mentor.pk
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content, expected.content)
+
+        response = await AsyncUserDetailView.as_view()(
+            self.factory.get(
+                path, headers={**self.headers, "If-None-Match": expected["ETag"]}
+            ),
+            pk=self.mentor.pk,
+        )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    async def test_user_detail_not_found_matches_sync_view(self):
+        path = reverse("api:users-detail", args=[0])
+        expected = await sync_to_async(self.sync_get)(path)
+
+        response = await AsyncUserDetailView.as_view()(
+            self.factory.get(path, headers=self.headers), pk=0
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.content, expected.content)
+
+    async def test_sparse_fieldsets_match_sync_view(self):
+        cases = [
+            (AsyncUserListView, reverse("api:users-list"), {}, "?omit=is_mentor"),
+            (
+                AsyncUserDetailView,
+                reverse("api:users-detail", args=[self.mentor.pk]),
+                {"pk": self.mentor.pk},
+                "?fields=username,mentees",
+            ),
+        ]
+        for view, url, kwargs, query in cases:
+            await sync_to_async(cache.clear)()
+            expected = await sync_to_async(self.sync_get)(url + query)
+
+            response = await view.as_view()(
+                self.factory.get(url + query, headers=self.headers), **kwargs
+            )
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.content, expected.content)
+
+    @override_settings(ROOT_URLCONF=AsyncReadUrls, SERVER_TIMING=True)
+    def test_async_views_queries_are_counted(self):
+        client = AsyncClient()
+        for url in (
+            reverse("api:users-list"),
+            reverse("api:users-detail", args=[self.mentor.pk]),
+        ):
+            response = async_to_sync(client.get)(url, headers=self.headers)
+
+            with self.subTest(url=url):
+                self.assertEqual(
+                    response.status_code, status.HTTP_200_OK, response.content
+                )
+                self.assertGreater(response.db_queries, 0)
+                self.assertIn(
+                    f'db;desc="{response.db_queries} queries"',
+                    response["Server-Timing"],
+                )
+
+    async def test_unauthenticated_request_rejected(self):
+        response = await AsyncUserListView.as_view()(
+            self.factory.get(reverse("api:users-list"))
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn("WWW-Authenticate", response)
+
+
+class TestCompiledRepresentation(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.mentor = User.objects.create_user(username="mentor", email="m@m.ru")
+        cls.mentee = User.objects.create_user(
+            username="mentee", phone_number="+79991234567", mentor=cls.mentor
+        )
+        cls.loner = User.objects.create_user(username="loner")
+
+    def assertSameRepresentation(self, serializer_class, objects, fieldset=None):
+        serializer = serializer_class(context={"fieldset": fieldset})
+        for obj in objects:
+            self.assertEqual(
+                serializer.to_representation(obj),
+                serializer_class(
+                    context={"fieldset": fieldset}
+                ).to_representation_fallback(obj),
+            )
+
+    def test_list_matches_drf(self):
+        for fieldset in (None, ("id",), ("username", "is_mentor")):
+            with self.subTest(fieldset=fieldset):
+                instances = list(User.objects.with_is_mentor().order_by("id"))
+                self.assertSameRepresentation(UserListSerializer, instances, fieldset)
+                rows = list(user_list_queryset(fieldset))
+                self.assertEqual(
+                    UserListSerializer(
+                        rows, many=True, context={"fieldset": fieldset}
+                    ).data,
+                    [
+                        UserListSerializer(
+                            context={"fieldset": fieldset}
+                        ).to_representation_fallback(user)
+                        for user in instances
+                    ],
+                )
+
+    def test_detail_matches_drf(self):
+        for fieldset in (None, ("mentor",), ("id", "mentees", "email")):
+            with self.subTest(fieldset=fieldset):
+                users = list(user_detail_queryset(fieldset).order_by("id"))
+                self.assertSameRepresentation(UserDetailSerializer, users, fieldset)
+        data = UserDetailSerializer(self.loner).data
+        self.assertNotIn("mentor", data)
+        self.assertNotIn("mentees", data)
+
+
+@skipIf(ORJSONRenderer is None, "orjson не установлен")
+class TestORJSON(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.mentor = User.objects.create_user(username="ментор", password="pass")
+        cls.mentee = User.objects.create_user(
+            username="mentee", password="pass", mentor=cls.mentor
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.mentor)
+
+    def assertSameRender(self, response):
+        self.assertEqual(ORJSONRenderer().render(response.data), response.content)
+
+    def test_responses_match_json_renderer(self):
+        self.assertSameRender(self.client.get(reverse("api:users-list")))
+        self.assertSameRender(
+            self.client.get(reverse("api:users-detail", args=[self.mentor.pk]))
+        )
+        response = self.client.post(
+            reverse("api:registration"),
+            {"username": "ментор", "password": "1", "phone_number": "телефон"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("Неверный формат".encode(), response.content)
+        self.assertSameRender(response)
+
+    def test_render_edge_cases_match_json_renderer(self):
+        data = {
+            "text": "строка\u2028\u2029\x00",
+            "when": timezone.now(),
+            "big": 2**70,
+            1: [("tuple",), None, True, 1.5],
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+
+    def test_parse_matches_json_parser(self):
+        for body in (
+            '{"username": "ментор", "ids": [1, 2.5, null]}'.encode(),
+            b'{"big": 123456789012345678901234567890}',
+        ):
+            self.assertEqual(
+                ORJSONParser().parse(BytesIO(body)), JSONParser().parse(BytesIO(body))
+            )
+
+        for body in (b"{", b'{"value": NaN}'):
+            with self.assertRaises(ParseError) as expected:
+                JSONParser().parse(BytesIO(body))
+            with self.assertRaises(ParseError) as parsed:
+                ORJSONParser().parse(BytesIO(body))
+            self.assertEqual(parsed.exception.detail, expected.exception.detail)
+
+
+class TestMetrics(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="user", password="pass")
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_requests_are_recorded(self):
+        labels = {"view": "api:users-list", "method": "GET"}
+        requests = self.sample("api_request_duration_seconds_count", **labels)
+        unauthorized = self.sample("api_responses_total", status="401", **labels)
+        queries = self.sample("api_db_queries_total", view="api:users-list")
+
+        self.client.get(reverse("api:users-list"))
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse("api:users-list"))
+
+        self.assertEqual(
+            self.sample("api_request_duration_seconds_count", **labels), requests + 2
+        )
+        self.assertEqual(
+            self.sample("api_responses_total", status="401", **labels),
+            unauthorized + 1,
+        )
+        self.assertEqual(
+            self.sample("api_db_queries_total", view="api:users-list"),
+            queries + response.db_queries,
+        )
+
+    def test_unknown_paths_share_one_series(self):
+        before = self.sample(
+            "api_responses_total", view="unmatched", method="GET", status="404"
+        )
+
+        self.client.get("/missing/1/")
+        self.client.get("/missing/2/")
+
+        self.assertEqual(
+            self.sample(
+                "api_responses_total", view="unmatched", method="GET", status="404"
+            ),
+            before + 2,
+        )
+
+    def test_auth_events_are_recorded(self):
+        events = ("login_success", "login_failure", "logout_success", "blacklist_hit")
+        before = {
+            event: self.sample("api_auth_events_total", event=event) for event in events
+        }
+
+        self.client.post(
+            reverse("api:token_obtain_pair"),
+            {"username": "user", "password": "wrong"},
+            format="json",
+        )
+        response = self.client.post(
+            reverse("api:token_obtain_pair"),
+            {"username": "user", "password": "pass"},
+            format="json",
+        )
+        refresh = response.data["refresh"]
+        self.client.post(
+            reverse("api:token_blacklist"), {"refresh": refresh}, format="json"
+        )
+        response = self.client.post(
+            reverse("api:token_refresh"), {"refresh": refresh}, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        for event in events:
+            self.assertEqual(
+                self.sample("api_auth_events_total", event=event),
+                before[event] + 1,
+                event,
+            )
+
+    def test_metrics_endpoint(self):
+        self.client.get(reverse("api:users-list"))
+
+        response = self.client.get(reverse("metrics"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertIn(
+            'api_responses_total{method="GET",status="401",view="api:users-list"}',
+            response.content.decode(),
+        )
+
+    def test_metrics_are_aggregated_across_processes(self):
+        script = (
+            "from api.metrics import record_auth_event; "
+            "record_auth_event('login_success')"
+        )
+        with TemporaryDirectory() as directory:
+            env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": directory}
+            for _ in range(2):
+                subprocess.run(
+                    [sys.executable, "-c", script],
+                    cwd=Path(__file__).resolve().parents[2],
+                    env=env,
+                    check=True,
+                )
+
+            with mock.patch.dict(os.environ, {"PROMETHEUS_MULTIPROC_DIR": directory}):
+                response = metrics_view(RequestFactory().get("/metrics"))
+
+        self.assertIn(
+            'api_auth_events_total{event="login_success"} 2.0',
+            response.content.decode(),
+        )
+
+    def test_pool_stats_are_recorded(self):
+        pool = mock.Mock()
+        pool.pop_stats.return_value = {
+            "pool_size": 3,
+            "pool_available": 1,
+            "requests_waiting": 0,
+            "requests_num": 5,
+            "requests_wait_ms": 250,
+            "requests_errors": 1,
+        }
+        requests = self.sample("api_db_pool_requests_total", alias="test")
+        timeouts = self.sample(
+            "api_db_pool_errors_total", alias="test", error="timeout"
+        )
+
+        record_pool_stats([("test", pool)])
+
+        self.assertEqual(
+            self.sample("api_db_pool_connections", alias="test", state="open"), 3
+        )
+        self.assertEqual(
+            self.sample("api_db_pool_connections", alias="test", state="idle"), 1
+        )
+        self.assertEqual(
+            self.sample("api_db_pool_requests_total", alias="test"), requests + 5
+        )
+        self.assertEqual(
+            self.sample("api_db_pool_errors_total", alias="test", error="timeout"),
+            timeouts + 1,
+        )
+        self.assertEqual(
+            self.sample("api_db_pool_errors_total", alias="test", error="lost"), 0
+        )
+
+
+@skipIf(
+    not connection.settings_dict["OPTIONS"].get("pool"),
+    "Пул подключений не настроен (DB_POOL)",
+)
+class TestConnectionPool(TransactionTestCase):
+    def test_connections_are_reused(self):
+        connection.close()
+        connection.pool.pop_stats()
+
+        for _ in range(3):
+            User.objects.exists()
+            connection.close()
+
+        stats = connection.pool.pop_stats()
+        self.assertEqual(stats["requests_num"], 3)
+        self.assertLessEqual(stats.get("connections_num", 0), 1)
+        self.assertEqual(stats["pool_size"] - stats["pool_available"], 0)
+
+
+@override_settings(DATABASE_REPLICAS=["replica1"])
+class TestReplicaRouting(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="writer", password="pass")
+        cls.other = User.objects.create_user(username="reader", password="pass")
+
+    def setUp(self):
+        cache.clear()
+        caches[MARKER_CACHE].clear()
+        user_cache.clear()
+        self.factory = RequestFactory()
+        self.aliases = []
+
+    def record_alias(self, request):
+        self.aliases.append(ReplicaRouter().db_for_read(User))
+        return HttpResponse()
+
+    def login(self, user):
+        client = APIClient()
+        response = client.post(
+            reverse("api:token_obtain_pair"),
+            {"username": user.username, "password": "pass"},
+            format="json",
+        )
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        return client
+
+    def test_only_safe_requests_read_from_replica(self):
+        middleware = ReplicaMiddleware(self.record_alias)
+
+        middleware(self.factory.get("/"))
+        middleware(self.factory.post("/"))
+
+        self.assertEqual(self.aliases, ["replica1", None])
+        self.assertIsNone(read_alias())
+
+    def test_writes_and_migrations_go_to_primary(self):
+        router = ReplicaRouter()
+        user = User(pk=self.user.pk)
+        user._state.db = "replica1"
+
+        self.assertEqual(router.db_for_write(User, instance=user), "default")
+        self.assertTrue(router.allow_relation(user, self.other))
+        self.assertFalse(router.allow_migrate("replica1", "api"))
+        self.assertTrue(router.allow_migrate("default", "api"))
+
+    def test_reads_stick_to_primary_after_write(self):
+        def write(request):
+            request.user = self.user
+            return HttpResponse()
+
+        def read_as(user):
+            def read(request):
+                stick_after_write(user.pk)
+                return self.record_alias(request)
+
+            return ReplicaMiddleware(read)
+
+        ReplicaMiddleware(write)(self.factory.patch("/"))
+        read_as(self.user)(self.factory.get("/"))
+        read_as(self.other)(self.factory.get("/"))
+
+        self.assertEqual(self.aliases, ["default", "replica1"])
+
+    def test_write_marker_survives_profile_cache_eviction(self):
+        def write(request):
+            request.user = self.user
+            return HttpResponse()
+
+        def read(request):
+            stick_after_write(self.user.pk)
+            return self.record_alias(request)
+
+        ReplicaMiddleware(write)(self.factory.patch("/"))
+        cache.clear()
+        ReplicaMiddleware(read)(self.factory.get("/"))
+
+        self.assertEqual(self.aliases, ["default"])
+
+    def test_writer_does_not_see_detail_cached_from_replica(self):
+        writer, reader = self.login(self.user), self.login(self.other)
+        url = reverse("api:users-detail", args=[self.user.pk])
+
+        writer.patch(url, {"email": "new@example.com"}, format="json")
+        # Параллельный запрос закэшировал профиль из отстающей реплики
+        set_user_detail(self.user.pk, etag='"stale"', data={"email": "old@example.com"})
+
+        self.assertEqual(reader.get(url).data["email"], "old@example.com")
+        self.assertEqual(writer.get(url).data["email"], "new@example.com")
+        # Автор записи заменил устаревшие данные в кэше
+        self.assertEqual(reader.get(url).data["email"], "new@example.com")
+
+
+@skipIf(not settings.DATABASE_REPLICAS, "Реплики не настроены (DB_REPLICA_HOSTS)")
+class TestReplicaDatabases(TransactionTestCase):
+    databases = "__all__"
+
+    def setUp(self):
+        cache.clear()
+        caches[MARKER_CACHE].clear()
+        user_cache.clear()
+        self.user = User.objects.create_user(username="user", password="pass")
+        self.client = APIClient()
+        response = self.client.post(
+            reverse("api:token_obtain_pair"),
+            {"username": "user", "password": "pass"},
+            format="json",
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+    @classmethod
+    def tearDownClass(cls):
+        # Подключения зеркал в пулах мешают удалить тестовую БД
+        for alias in settings.DATABASE_REPLICAS:
+            connections[alias].close()
+            if connections.settings[alias].get("OPTIONS", {}).get("pool"):
+                connections[alias].close_pool()
+        super().tearDownClass()
+
+    def test_reads_use_replicas_until_write(self):
+        replicas = [connections[alias] for alias in settings.DATABASE_REPLICAS]
+        url = reverse("api:users-detail", args=[self.user.pk])
+
+        with ExitStack() as stack:
+            queries = [
+                stack.enter_context(CaptureQueriesContext(replica))
+                for replica in replicas
+            ]
+            self.client.get(reverse("api:users-list"))
+        self.assertGreater(sum(len(captured) for captured in queries), 0)
+
+        self.client.patch(url, {"email": "new@example.com"}, format="json")
+        with ExitStack() as stack:
+            queries = [
+                stack.enter_context(CaptureQueriesContext(replica))
+                for replica in replicas
+            ]
+            response = self.client.get(url)
+        self.assertEqual(sum(len(captured) for captured in queries), 0)
+        self.assertEqual(response.data["email"], "new@example.com")
@@ -0,0 +1,28 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from .blacklist import blacklist_filter
+from .metrics import record_auth_event
+
+
+class RefreshToken(tokens.RefreshToken):
+    def check_blacklist(self):
+        # В БД идем только при возможном попадании в фильтр
+        if blacklist_filter.might_contain(self.payload[api_settings.JTI_CLAIM]):
+            try:
+                super().check_blacklist()
+            except TokenError:
+                record_auth_event("blacklist_hit")
+                raise
+
+    def blacklist(self):
+        blacklisted, created = super().blacklist()
+        blacklist_filter.add(self.payload[api_settings.JTI_CLAIM])
+        # Вставка в черный список окончательно проверяет отзыв токена,
+        # даже если фильтр воркера еще не синхронизирован с БД
+        if not created:
+            record_auth_event("blacklist_hit")
+            raise TokenError(_("Token is blacklisted"))
+        return blacklisted, created
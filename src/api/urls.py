@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from drf_spectacular.views import (
     SpectacularAPIView,
@@ -5,16 +6,29 @@ from drf_spectacular.views import (
 )
 
 from .views import (
+    MentorshipBulkView,
     RegistrationView,
     TokenBlacklistView,
     TokenObtainPairView,
     TokenRefreshView,
+    UserAncestorsView,
+    UserChangesView,
+    UserDescendantsView,
     UserDetailView,
+    UserExportView,
     UserListView,
 )
 
 app_name = "api"
 
+user_list_view = UserListView.as_view()
+user_detail_view = UserDetailView.as_view()
+if settings.ASYNC_READ_VIEWS:
+    from .async_views import AsyncUserDetailView, AsyncUserListView, read_async
+
+    user_list_view = read_async(AsyncUserListView.as_view(), user_list_view)
+    user_detail_view = read_async(AsyncUserDetailView.as_view(), user_detail_view)
+
 urlpatterns = [
     # API docs
     path("schema/", SpectacularAPIView.as_view(), name="schema"),
@@ -29,6 +43,23 @@ urlpatterns = [
     path("refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("logout/", TokenBlacklistView.as_view(), name="token_blacklist"),
     # API users
-    path("users/", UserListView.as_view(), name="users-list"),
-    path("users/<int:pk>/", UserDetailView.as_view(), name="users-detail"),
+    path("users/", user_list_view, name="users-list"),
+    path("users/<int:pk>/", user_detail_view, name="users-detail"),
+    path(
+        "users/<int:pk>/ancestors/",
+        UserAncestorsView.as_view(),
+        name="users-ancestors",
+    ),
+    path(
+        "users/<int:pk>/descendants/",
+        UserDescendantsView.as_view(),
+        name="users-descendants",
+    ),
+    path("users/export/", UserExportView.as_view(), name="users-export"),
+    path("users/changes/", UserChangesView.as_view(), name="users-changes"),
+    path(
+        "users/mentorship/",
+        MentorshipBulkView.as_view(),
+        name="users-mentorship",
+    ),
 ]
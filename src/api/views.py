@@ -1,14 +1,34 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Prefetch
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import F, Prefetch
+from django.http import StreamingHttpResponse
 from rest_framework import generics
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
 from rest_framework_simplejwt import views as jwt_views
 
+from .caches import get_user_detail, set_user_detail
+from .conditional import ConditionalGetMixin, user_detail_etag, user_list_etag
 from .docs import docs_schemes
+from .export import EXPORT_FORMATS, async_blocks, buffered, export_rows
+from .fieldsets import SparseFieldsetMixin, trim
+from .filters import UserFilterBackend
+from .hierarchy import ancestors, descendants
+from .metrics import record_auth_event
+from .pagination import (
+    ChangesCursorPagination,
+    CursorPaginationMixin,
+    UncountedLimitOffsetPagination,
+)
 from .permissions import IsSelf
 from .serializers import (
+    BulkMentorshipSerializer,
     RegistrationSerializer,
+    UserChangeSerializer,
     UserDetailSerializer,
+    UserHierarchySerializer,
     UserListSerializer,
     UserUpdateSerializer,
 )
@@ -16,28 +36,143 @@ from .serializers import (
 User = get_user_model()
 
 
+def user_list_queryset(fieldset=None):
+    """
+    Строки .values() списка пользователей: только колонки, нужные полям
+    ответа и ETag.
+    """
+    queryset = User.objects.order_by("id")
+    fieldset = set(UserListSerializer.Meta.fields if fieldset is None else fieldset)
+    columns = ["id", "version"]
+    if "username" in fieldset:
+        columns.append("username")
+    if "is_mentor" in fieldset:
+        return queryset.with_is_mentor().values(*columns, is_mentor=F("has_mentees"))
+    return queryset.values(*columns)
+
+
+def user_detail_queryset(fieldset=None):
+    """Профиль пользователя: JOIN ментора и prefetch менти только по запросу."""
+    fieldset = set(UserDetailSerializer.Meta.fields if fieldset is None else fieldset)
+    queryset = User.objects.all()
+    columns = {"id", "version"} | ({"username", "email", "phone_number"} & fieldset)
+    if "mentor" in fieldset:
+        queryset = queryset.select_related("mentor")
+        columns |= {"mentor__username"}
+    if "mentees" in fieldset:
+        queryset = queryset.prefetch_related(
+            Prefetch("mentees", queryset=User.objects.only("username", "mentor_id"))
+        )
+    return queryset.only(*columns)
+
+
+def user_changes_queryset():
+    """Строки .values() для синхронизации изменений пользователей."""
+    return User.objects.with_is_mentor().values(
+        "id",
+        "username",
+        "email",
+        "phone_number",
+        "is_active",
+        "version",
+        "updated_at",
+        mentor_username=F("mentor__username"),
+        is_mentor=F("has_mentees"),
+    )
+
+
 @docs_schemes["registration"]
 class RegistrationView(generics.CreateAPIView):
     serializer_class = RegistrationSerializer
     permission_classes = [AllowAny]
     authentication_classes = []
+    # Проверка уникальности username и INSERT
+    query_budget = 2
 
 
 @docs_schemes["user_list"]
-class UserListView(generics.ListAPIView):
+class UserListView(
+    ConditionalGetMixin,
+    SparseFieldsetMixin,
+    CursorPaginationMixin,
+    generics.ListAPIView,
+):
     serializer_class = UserListSerializer
-    queryset = User.objects.prefetch_related(
-        Prefetch("mentees", queryset=User.objects.only("username"))
-    )
+    queryset = user_list_queryset()
     permission_classes = [IsAuthenticated]
+    filter_backends = [UserFilterBackend]
+    # Пользователь из токена (без кэша), COUNT и страница
+    query_budget = 3
+
+    def get_queryset(self):
+        return user_list_queryset(self.get_fieldset())
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        users = page if page is not None else list(queryset)
+
+        etag = user_list_etag(users, getattr(self.paginator, "count", None))
+        not_modified = self.not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        serializer = self.get_serializer(users, many=True)
+        if page is not None:
+            response = self.get_paginated_response(serializer.data)
+        else:
+            response = Response(serializer.data)
+        response["ETag"] = etag
+        return response
 
 
 @docs_schemes["user_detail"]
-class UserDetailView(generics.RetrieveUpdateAPIView):
-    queryset = User.objects.select_related("mentor").prefetch_related(
-        Prefetch("mentees", queryset=User.objects.only("username"))
-    )
+@docs_schemes["user_detail_get"]
+class UserDetailView(
+    ConditionalGetMixin, SparseFieldsetMixin, generics.RetrieveUpdateAPIView
+):
+    queryset = user_detail_queryset()
     permission_classes = [IsAuthenticated, IsSelf]
+    cached_detail = None
+    # GET: пользователь из токена, профиль с ментором и менти.
+    # Смена ментора и менти: проверки, блокировка затронутых строк (и еще раз
+    # в save()), по одному UPDATE на добавленных, удаленных и их прежних менторов
+    query_budget = {"GET": 3, "HEAD": 3, "PUT": 13, "PATCH": 13}
+
+    def get_queryset(self):
+        if self.request.method != "GET":
+            return User.objects.all()
+        return user_detail_queryset(self.get_fieldset())
+
+    def get_etag(self, request, *args, **kwargs):
+        # Неверный ?fields= дает 400 раньше, чем проверка If-None-Match
+        self.get_fieldset()
+        pk = kwargs[self.lookup_field]
+        self.cached_detail = get_user_detail(pk)
+        if self.cached_detail is not None:
+            return self.cached_detail["etag"]
+        if "If-None-Match" not in request.headers:
+            return None
+        version = User.objects.filter(pk=pk).values_list("version", flat=True).first()
+        if version is None:
+            return None
+        return user_detail_etag(pk, version)
+
+    def retrieve(self, request, *args, **kwargs):
+        fieldset = self.get_fieldset()
+        if self.cached_detail is None:
+            instance = self.get_object()
+            serializer = self.get_serializer(instance)
+            etag = user_detail_etag(instance.pk, instance.version)
+            if fieldset is not None:
+                # В кэше хранится только полное представление
+                return Response(serializer.data, headers={"ETag": etag})
+            self.cached_detail = {"etag": etag, "data": serializer.data}
+            set_user_detail(instance.pk, **self.cached_detail)
+        return Response(
+            trim(self.cached_detail["data"], fieldset),
+            headers={"ETag": self.cached_detail["etag"]},
+        )
 
     def get_serializer_class(self):
         if self.request.method == "GET":
@@ -45,16 +180,124 @@ class UserDetailView(generics.RetrieveUpdateAPIView):
         return UserUpdateSerializer
 
 
+class UserHierarchyView(generics.GenericAPIView):
+    serializer_class = UserHierarchySerializer
+    pagination_class = UncountedLimitOffsetPagination
+    permission_classes = [IsAuthenticated]
+    queryset = User.objects.only("id")
+    walk = None
+    # Пользователь из токена, проверка пользователя и рекурсивный запрос
+    query_budget = 3
+
+    def get_depth(self):
+        max_depth = settings.HIERARCHY_MAX_DEPTH
+        try:
+            depth = int(self.request.query_params.get("depth", max_depth))
+        except ValueError:
+            raise ValidationError({"depth": "Глубина должна быть целым числом"})
+        if depth < 1:
+            raise ValidationError({"depth": "Глубина должна быть положительной"})
+        return min(depth, max_depth)
+
+    def get(self, request, *args, **kwargs):
+        user = self.get_object()
+        depth = self.get_depth()
+        rows = self.paginator.paginate_rows(
+            lambda limit, offset: self.walk(user.pk, depth, limit, offset),
+            request,
+            view=self,
+        )
+        serializer = self.get_serializer(rows, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+@docs_schemes["user_ancestors"]
+class UserAncestorsView(UserHierarchyView):
+    walk = staticmethod(ancestors)
+
+
+@docs_schemes["user_descendants"]
+class UserDescendantsView(UserHierarchyView):
+    walk = staticmethod(descendants)
+
+
+@docs_schemes["user_changes"]
+class UserChangesView(generics.ListAPIView):
+    serializer_class = UserChangeSerializer
+    queryset = user_changes_queryset()
+    pagination_class = ChangesCursorPagination
+    permission_classes = [IsAuthenticated]
+    # Пользователь из токена и страница изменений по индексу (updated_at, id)
+    query_budget = 2
+
+
+@docs_schemes["mentorship_bulk"]
+class MentorshipBulkView(generics.GenericAPIView):
+    serializer_class = BulkMentorshipSerializer
+    permission_classes = [IsAdminUser]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(serializer.save())
+
+
+@docs_schemes["user_export"]
+class UserExportView(generics.GenericAPIView):
+    permission_classes = [IsAdminUser]
+    output_param = "output"
+
+    def get(self, request, *args, **kwargs):
+        output = request.query_params.get(self.output_param, "ndjson")
+        if output not in EXPORT_FORMATS:
+            raise ValidationError(
+                {
+                    self.output_param: f"Поддерживаются форматы: {', '.join(EXPORT_FORMATS)}"
+                }
+            )
+        lines, content_type = EXPORT_FORMATS[output]
+        rows = export_rows(settings.USER_EXPORT_CHUNK_SIZE)
+        blocks = buffered(lines(rows), settings.USER_EXPORT_BUFFER_SIZE)
+        if isinstance(request._request, ASGIRequest):
+            blocks = async_blocks(blocks)
+        response = StreamingHttpResponse(
+            blocks, content_type=f"{content_type}; charset=utf-8"
+        )
+        response["Content-Disposition"] = f'attachment; filename="users.{output}"'
+        return response
+
+
+class AuthEventMixin:
+    # Исход запроса к эндпоинту токенов в метриках: <auth_event>_success
+    # или <auth_event>_failure
+    auth_event = None
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if request.method == "POST":
+            outcome = "failure" if response.status_code >= 400 else "success"
+            record_auth_event(f"{self.auth_event}_{outcome}")
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
 @docs_schemes["logout"]
-class TokenBlacklistView(jwt_views.TokenBlacklistView):
-    pass
+class TokenBlacklistView(AuthEventMixin, jwt_views.TokenBlacklistView):
+    auth_event = "logout"
+
+    # Синхронизация фильтра Блума, выпущенный токен и запись в черный список
+    query_budget = 5
 
 
 @docs_schemes["login"]
-class TokenObtainPairView(jwt_views.TokenObtainPairView):
-    pass
+class TokenObtainPairView(AuthEventMixin, jwt_views.TokenObtainPairView):
+    auth_event = "login"
+
+    # Пользователь, выпуск refresh-токена, last_login или пересчет хэша
+    query_budget = 3
 
 
 @docs_schemes["refresh"]
-class TokenRefreshView(jwt_views.TokenRefreshView):
-    pass
+class TokenRefreshView(AuthEventMixin, jwt_views.TokenRefreshView):
+    auth_event = "refresh"
+
+    # simplejwt читает пользователя в validate(), blacklist() и outstand()
+    query_budget = 11
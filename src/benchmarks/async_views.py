@@ -0,0 +1,174 @@
+"""
+Сравнение синхронного (WSGI, пул воркеров) и асинхронного (ASGI, один
+event loop) стеков на GET /users/ и GET /users/{id}/.
+
+Оба стека получают одинаковое число одновременных клиентов; у синхронного
+стека запросы сверх числа воркеров ждут в очереди, и это ожидание входит
+в задержку, как при работе gunicorn с sync-воркерами.
+
+    python -m benchmarks.async_views --users 10000 --requests 2000 \
+        --concurrency 100 --workers 4 --db-latency 0.005
+"""
+
+import argparse
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .common import (
+    benchmark_database,
+    inject_db_latency,
+    print_results,
+    seed_users,
+    setup_django,
+    summarize,
+    wsgi_request,
+)
+
+
+def wsgi_get(application, path, token):
+    status = wsgi_request(
+        application, "GET", path, headers={"Authorization": f"Bearer {token}"}
+    )
+    assert status == 200, status
+
+
+async def asgi_get(application, path, token):
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [
+            (b"host", b"testserver"),
+            (b"authorization", f"Bearer {token}".encode()),
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": ("testserver", 80),
+    }
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Future()
+
+    statuses = []
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    await application(scope, receive, send)
+    assert statuses[0] == 200, statuses[0]
+
+
+def run_sync(paths, token, concurrency, workers):
+    from django.core.wsgi import get_wsgi_application
+
+    application = get_wsgi_application()
+    # Клиентов больше, чем синхронных воркеров: лишние запросы ждут в очереди
+    worker_slots = threading.Semaphore(workers)
+
+    def request(path):
+        started = time.perf_counter()
+        with worker_slots:
+            wsgi_get(application, path, token)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(request, paths))
+    return latencies, time.perf_counter() - started
+
+
+async def run_async(paths, token, concurrency):
+    from django.core.asgi import get_asgi_application
+
+    application = get_asgi_application()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(path):
+        started = time.perf_counter()
+        async with semaphore:
+            await asgi_get(application, path, token)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(limited(path) for path in paths))
+    return list(latencies), time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument(
+        "--db-latency", type=float, default=0.02, help="Задержка запроса к БД, с"
+    )
+    parser.add_argument("--output", help="Файл для результатов в JSON")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.core.cache import cache
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    settings.ROOT_URLCONF = "benchmarks.urls"
+    with benchmark_database():
+        users = seed_users(args.users)
+        token = str(AccessToken.for_user(users[0]))
+        inject_db_latency(args.db_latency)
+
+        results = []
+        for endpoint in (f"users/?limit={args.page_size}", "users/{id}/"):
+            paths = [
+                endpoint.format(id=users[i % len(users)].pk)
+                for i in range(args.requests)
+            ]
+            cache.clear()
+            latencies, elapsed = run_sync(
+                [f"/sync/{path}" for path in paths],
+                token,
+                args.concurrency,
+                args.workers,
+            )
+            results.append(
+                summarize(
+                    f"sync {endpoint}",
+                    latencies,
+                    elapsed,
+                    concurrency=args.concurrency,
+                    workers=args.workers,
+                )
+            )
+            cache.clear()
+            latencies, elapsed = asyncio.run(
+                run_async([f"/async/{path}" for path in paths], token, args.concurrency)
+            )
+            results.append(
+                summarize(
+                    f"async {endpoint}",
+                    latencies,
+                    elapsed,
+                    concurrency=args.concurrency,
+                )
+            )
+
+    print_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+import io
+import json
+import os
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+
+
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+    import django
+
+    django.setup()
+
+
+@contextmanager
+def benchmark_database():
+    """Создает отдельную тестовую БД, как это делает тестовый раннер Django."""
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def seed_users(count, fanout=10, password_hash="!"):
+    """
+    Создает count пользователей через bulk_create: каждый fanout-й
+    пользователь становится ментором следующих за ним fanout пользователей.
+    """
+    from django.contrib.auth import get_user_model
+
+    User = get_user_model()
+    users = User.objects.bulk_create(
+        [
+            User(
+                username=f"user{i}",
+                email=f"user{i}@example.com",
+                password=password_hash,
+            )
+            for i in range(count)
+        ],
+        batch_size=1000,
+    )
+    if not users or users[0].pk is None:
+        users = list(User.objects.order_by("id"))
+    for i, user in enumerate(users):
+        mentor_index = i // (fanout + 1) * (fanout + 1)
+        user.mentor_id = users[mentor_index].pk if mentor_index != i else None
+    User.objects.bulk_update(users, ["mentor"], batch_size=1000)
+    return users
+
+
+def seed_dataset(
+    count,
+    max_fanout=50,
+    max_depth=10,
+    mentee_share=0.8,
+    mentor_share=0.1,
+    seed=0,
+    password_hash="!",
+    batch_size=5000,
+):
+    """
+    Создает count пользователей одним проходом bulk_create с явными id:
+    ментор всегда создается раньше своих менти. Доля mentee_share
+    пользователей получает ментора, доля mentor_share берет менти;
+    число менти у ментора распределено по Парето (не больше max_fanout),
+    длина цепочек менторов — не больше max_depth.
+    Возвращает список (id, mentor_id, глубина).
+    """
+    import random
+
+    from django.contrib.auth import get_user_model
+    from django.core.management.color import no_style
+    from django.db import connection
+
+    User = get_user_model()
+    rng = random.Random(seed)
+    # Свободные места у менторов: [id, осталось менти, глубина]
+    open_mentors = []
+    users = []
+    for user_id in range(1, count + 1):
+        mentor_id, depth = None, 0
+        if open_mentors and rng.random() < mentee_share:
+            index = rng.randrange(len(open_mentors))
+            slot = open_mentors[index]
+            mentor_id, depth = slot[0], slot[2] + 1
+            slot[1] -= 1
+            if not slot[1]:
+                open_mentors[index] = open_mentors[-1]
+                open_mentors.pop()
+        if depth < max_depth and rng.random() < mentor_share:
+            fanout = min(max_fanout, int(rng.paretovariate(1.2)))
+            open_mentors.append([user_id, fanout, depth])
+        users.append((user_id, mentor_id, depth))
+
+    for start in range(0, count, batch_size):
+        User.objects.bulk_create(
+            [
+                User(
+                    id=user_id,
+                    username=f"user{user_id}",
+                    email=f"user{user_id}@example.com",
+                    password=password_hash,
+                    mentor_id=mentor_id,
+                )
+                for user_id, mentor_id, _ in users[start : start + batch_size]
+            ]
+        )
+    # Последовательность id должна продолжиться после явно заданных
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [User]):
+            cursor.execute(sql)
+    return users
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def count_queries():
+    """Считает запросы к БД по умолчанию в текущем потоке."""
+    from django.db import connection
+
+    counter = QueryCounter()
+    with connection.execute_wrapper(counter):
+        yield counter
+
+
+def inject_db_latency(seconds):
+    """Добавляет задержку к каждому запросу в БД, имитируя сетевой RTT."""
+    if not seconds:
+        return
+    from django.db.backends.signals import connection_created
+
+    def delay(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        connection.execute_wrappers.append(delay)
+
+    connection_created.connect(install, weak=False)
+    from django.db import connections
+
+    for connection in connections.all():
+        if connection.connection is not None:
+            connection.execute_wrappers.append(delay)
+
+
+def wsgi_call(application, method, path, body=b"", headers=None):
+    """
+    Выполняет запрос к WSGI-приложению в текущем потоке,
+    возвращает статус и тело ответа.
+    """
+    path, _, query = path.partition("?")
+    environ = {
+        "REQUEST_METHOD": method,
+        "PATH_INFO": path,
+        "QUERY_STRING": query,
+        "SERVER_NAME": "testserver",
+        "SERVER_PORT": "80",
+        "HTTP_HOST": "testserver",
+        "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.url_scheme": "http",
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+    }
+    for name, value in (headers or {}).items():
+        environ[f"HTTP_{name.upper().replace('-', '_')}"] = value
+    statuses = []
+    response = application(environ, lambda status, headers: statuses.append(status))
+    try:
+        content = b"".join(response)
+    finally:
+        if hasattr(response, "close"):
+            response.close()
+    return int(statuses[0].split()[0]), content
+
+
+def wsgi_request(application, method, path, body=b"", headers=None):
+    """Выполняет запрос к WSGI-приложению в текущем потоке, возвращает статус."""
+    return wsgi_call(application, method, path, body, headers)[0]
+
+
+def measure(function, iterations):
+    """Вызывает function iterations раз, возвращает задержки и общее время."""
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call_started = time.perf_counter()
+        function()
+        latencies.append(time.perf_counter() - call_started)
+    return latencies, time.perf_counter() - started
+
+
+def percentile(values, percent):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(percent / 100 * len(values)) - 1))
+    return values[index]
+
+
+def summarize(name, latencies, elapsed, **extra):
+    return {
+        "name": name,
+        "requests": len(latencies),
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        **extra,
+    }
+
+
+def print_results(results, output=None, meta=None, columns=None):
+    """
+    Печатает таблицу результатов и сохраняет их в JSON: список результатов
+    или, если передано meta, объект {"meta": ..., "results": ...}.
+    """
+    columns = columns or [
+        "name",
+        "requests",
+        "throughput_rps",
+        "p50_ms",
+        "p95_ms",
+        "p99_ms",
+    ]
+    print("  ".join(f"{column:>16}" for column in columns))
+    for result in results:
+        print(
+            "  ".join(
+                f"{result[column]:>16.2f}"
+                if isinstance(result[column], float)
+                else f"{result[column]:>16}"
+                for column in columns
+            )
+        )
+    if output:
+        with open(output, "w") as file:
+            json.dump(
+                results if meta is None else {"meta": meta, "results": results},
+                file,
+                indent=2,
+                ensure_ascii=False,
+            )
+
+
+def compare_results(results, baseline_path, metrics=("p50_ms", "p95_ms", "p99_ms")):
+    """Печатает изменение метрик относительно сохраненного прогона, в процентах."""
+    with open(baseline_path) as file:
+        baseline = json.load(file)
+    if isinstance(baseline, dict):
+        baseline = baseline["results"]
+    baseline = {result["name"]: result for result in baseline}
+
+    print(f"Сравнение с {baseline_path}:")
+    print("  ".join(f"{column:>16}" for column in ("name", *metrics)))
+    for result in results:
+        before = baseline.get(result["name"])
+        if before is None:
+            continue
+        changes = []
+        for metric in metrics:
+            if before.get(metric):
+                change = (result[metric] - before[metric]) / before[metric] * 100
+                changes.append(f"{change:>+15.1f}%")
+            else:
+                changes.append(f"{'—':>16}")
+        print("  ".join([f"{result['name']:>16}", *changes]))
@@ -0,0 +1,172 @@
+"""
+Задержка запроса GET /users/ при трех способах подключения к PostgreSQL:
+новое подключение на каждый запрос (CONN_MAX_AGE=0), постоянные подключения
+Django (CONN_MAX_AGE) и пул подключений psycopg 3 (DB_POOL). Запросы идут
+через WSGI-приложение в --threads потоках, как у gunicorn с --threads;
+подключение освобождается по сигналу request_finished, как в gunicorn.
+
+Нужен PostgreSQL из настроек проекта (DB_ENGINE=django.db.backends.postgresql);
+для прогона создается отдельная тестовая БД.
+
+    python -m benchmarks.db_pool --users 10000 --requests 2000 --threads 4
+"""
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .common import (
+    benchmark_database,
+    print_results,
+    seed_users,
+    setup_django,
+    summarize,
+    wsgi_request,
+)
+
+COLUMNS = [
+    "name",
+    "requests",
+    "throughput_rps",
+    "p50_ms",
+    "p95_ms",
+    "p99_ms",
+    "connections",
+]
+
+
+def configure(connection, mode, args):
+    """Переключает подключение default на один из способов подключения."""
+    from django.db import connections
+
+    for alias in connections:
+        connections[alias].close()
+    connection.close_pool()
+    settings = connection.settings_dict
+    settings["CONN_MAX_AGE"] = args.conn_max_age if mode == "persistent" else 0
+    settings["CONN_HEALTH_CHECKS"] = not args.no_health_checks
+    settings["OPTIONS"].pop("pool", None)
+    if mode == "pool":
+        settings["OPTIONS"]["pool"] = {
+            "min_size": args.threads,
+            "max_size": args.threads,
+            "timeout": 10.0,
+        }
+
+
+def pool_connections_opened(alias):
+    from prometheus_client import REGISTRY
+
+    value = REGISTRY.get_sample_value(
+        "api_db_pool_connections_opened_total", {"alias": alias}
+    )
+    return value or 0
+
+
+def run_mode(application, connection, mode, path, token, args):
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+
+    from api.metrics import record_pool_stats
+
+    configure(connection, mode, args)
+    pool_opened = pool_connections_opened(connection.alias)
+    opened = []
+
+    def count(sender, connection, **kwargs):
+        opened.append(connection.alias)
+
+    connection_created.connect(count)
+    headers = {"Authorization": f"Bearer {token}"}
+    lock = threading.Lock()
+    latencies = []
+
+    def worker(requests):
+        try:
+            for i in range(requests):
+                started = time.perf_counter()
+                status = wsgi_request(application, "GET", path, headers=headers)
+                elapsed = time.perf_counter() - started
+                assert status == 200, status
+                if i >= args.warmup:
+                    with lock:
+                        latencies.append(elapsed)
+        finally:
+            # Постоянные подключения потока иначе переживут прогон
+            connections.close_all()
+
+    per_thread = args.requests // args.threads + args.warmup
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(args.threads) as executor:
+            for future in [
+                executor.submit(worker, per_thread) for _ in range(args.threads)
+            ]:
+                future.result()
+        elapsed = time.perf_counter() - started
+        opened = len(opened)
+        if mode == "pool":
+            # connection_created срабатывает и при выдаче подключения из пула,
+            # а статистику пула забирает MetricsMiddleware
+            record_pool_stats()
+            opened = int(pool_connections_opened(connection.alias) - pool_opened)
+    finally:
+        connection_created.disconnect(count)
+        configure(connection, "new", args)
+
+    return summarize(mode, latencies, elapsed, connections=opened)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--conn-max-age", type=int, default=600)
+    parser.add_argument("--no-health-checks", action="store_true")
+    parser.add_argument(
+        "--mode",
+        action="append",
+        choices=["new", "persistent", "pool"],
+        help="Запустить только указанные способы подключения",
+    )
+    parser.add_argument("--output", help="Файл для результатов в JSON")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.cache import cache
+    from django.core.wsgi import get_wsgi_application
+    from django.db import connection
+    from django.urls import reverse
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    if connection.vendor != "postgresql":
+        parser.error("нужен PostgreSQL: DB_ENGINE=django.db.backends.postgresql")
+
+    with benchmark_database() as connection:
+        users = seed_users(args.users)
+        token = str(AccessToken.for_user(users[0]))
+        path = f"{reverse('api:users-list')}?limit={args.page_size}"
+        application = get_wsgi_application()
+
+        results = []
+        for mode in args.mode or ["new", "persistent", "pool"]:
+            cache.clear()
+            results.append(run_mode(application, connection, mode, path, token, args))
+        cache.clear()
+
+    print_results(
+        results,
+        args.output,
+        meta={"threads": args.threads, "args": vars(args)},
+        columns=COLUMNS,
+    )
+
+
+if __name__ == "__main__":
+    main()
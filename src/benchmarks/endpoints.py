@@ -0,0 +1,292 @@
+"""
+Прогон всех эндпоинтов API на сгенерированном наборе данных: регистрация,
+вход, обновление и отзыв токена, список пользователей, профиль (GET и PATCH),
+цепочки менторов и менти. Запросы выполняются последовательно через
+WSGI-приложение в текущем процессе; для каждого эндпоинта считаются
+p50/p95/p99, пропускная способность и число SQL-запросов.
+
+БД берется из настроек проекта (DB_ENGINE и др.): SQLite локально или
+PostgreSQL, если он настроен. Для прогона создается отдельная тестовая БД.
+
+    python -m benchmarks.endpoints --users 100000 --requests 500 --output base.json
+    python -m benchmarks.endpoints --users 100000 --requests 500 --compare base.json
+"""
+
+import argparse
+import json
+import logging
+import platform
+import random
+import time
+from datetime import datetime, timezone
+
+from .common import (
+    benchmark_database,
+    compare_results,
+    count_queries,
+    print_results,
+    seed_dataset,
+    setup_django,
+    summarize,
+    wsgi_call,
+)
+
+PASSWORD = "benchmark-password"
+
+COLUMNS = [
+    "name",
+    "requests",
+    "throughput_rps",
+    "p50_ms",
+    "p95_ms",
+    "p99_ms",
+    "queries_mean",
+    "queries_max",
+]
+
+
+def build_scenarios(users, rng, args):
+    """
+    Сценарии эндпоинтов: имя, функция i -> (метод, путь, данные, токен)
+    и обработчик тела ответа. Токены выпускаются заранее, вне замера.
+    """
+    from django.contrib.auth import get_user_model
+    from django.urls import reverse
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from api.tokens import RefreshToken
+
+    User = get_user_model()
+    total = args.warmup + args.requests
+
+    def pick():
+        return users[rng.randrange(len(users))]
+
+    picked = [pick() for _ in range(total)]
+    mentors = [user for user in users if user[2] > 0] or users
+    deep = [mentors[rng.randrange(len(mentors))] for _ in range(total)]
+    access = [str(AccessToken.for_user(User(pk=user_id))) for user_id, _, _ in picked]
+    refresh = {"token": str(RefreshToken.for_user(User(pk=users[0][0])))}
+    logout = [str(RefreshToken.for_user(User(pk=user_id))) for user_id, _, _ in picked]
+    page = args.page_size
+
+    def refreshed(content):
+        # Старый refresh-токен после ротации отозван
+        refresh["token"] = json.loads(content)["refresh"]
+
+    return [
+        (
+            "registration",
+            lambda i: (
+                "POST",
+                reverse("api:registration"),
+                {"username": f"bench{i}", "password": PASSWORD},
+                None,
+            ),
+            None,
+        ),
+        (
+            "login",
+            lambda i: (
+                "POST",
+                reverse("api:token_obtain_pair"),
+                {"username": f"user{picked[i][0]}", "password": PASSWORD},
+                None,
+            ),
+            None,
+        ),
+        (
+            "refresh",
+            lambda i: (
+                "POST",
+                reverse("api:token_refresh"),
+                {"refresh": refresh["token"]},
+                None,
+            ),
+            refreshed,
+        ),
+        (
+            "logout",
+            lambda i: (
+                "POST",
+                reverse("api:token_blacklist"),
+                {"refresh": logout[i]},
+                None,
+            ),
+            None,
+        ),
+        (
+            "users-list",
+            lambda i: (
+                "GET",
+                f"{reverse('api:users-list')}?limit={page}"
+                f"&offset={rng.randrange(max(1, len(users) - page))}",
+                None,
+                access[i],
+            ),
+            None,
+        ),
+        (
+            "users-list cursor",
+            lambda i: (
+                "GET",
+                f"{reverse('api:users-list')}?pagination=cursor&limit={page}",
+                None,
+                access[i],
+            ),
+            None,
+        ),
+        (
+            "users-list search",
+            lambda i: (
+                "GET",
+                f"{reverse('api:users-list')}?limit={page}"
+                f"&search=user{picked[i][0] % 1000}",
+                None,
+                access[i],
+            ),
+            None,
+        ),
+        (
+            "users-detail GET",
+            lambda i: (
+                "GET",
+                reverse("api:users-detail", args=[picked[i][0]]),
+                None,
+                access[i],
+            ),
+            None,
+        ),
+        (
+            "users-detail PATCH",
+            lambda i: (
+                "PATCH",
+                reverse("api:users-detail", args=[picked[i][0]]),
+                {"email": f"bench{i}@example.com"},
+                access[i],
+            ),
+            None,
+        ),
+        (
+            "users-ancestors",
+            lambda i: (
+                "GET",
+                reverse("api:users-ancestors", args=[deep[i][0]]),
+                None,
+                access[i],
+            ),
+            None,
+        ),
+        (
+            "users-descendants",
+            lambda i: (
+                "GET",
+                reverse("api:users-descendants", args=[deep[i][1] or deep[i][0]])
+                + f"?limit={page}",
+                None,
+                access[i],
+            ),
+            None,
+        ),
+    ]
+
+
+def run_scenario(application, name, request, on_response, args):
+    latencies, queries, statuses = [], [], {}
+    for i in range(args.warmup + args.requests):
+        method, path, data, token = request(i)
+        body = b"" if data is None else json.dumps(data).encode()
+        headers = {"Authorization": f"Bearer {token}"} if token else None
+        with count_queries() as counter:
+            started = time.perf_counter()
+            status, content = wsgi_call(application, method, path, body, headers)
+            elapsed = time.perf_counter() - started
+        if on_response is not None and status < 400:
+            on_response(content)
+        if i < args.warmup:
+            continue
+        latencies.append(elapsed)
+        queries.append(counter.count)
+        statuses[status] = statuses.get(status, 0) + 1
+
+    return summarize(
+        name,
+        latencies,
+        sum(latencies),
+        queries_mean=sum(queries) / len(queries) if queries else 0.0,
+        queries_max=max(queries, default=0),
+        statuses=statuses,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--max-fanout", type=int, default=50)
+    parser.add_argument("--max-depth", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--only", action="append", help="Запустить только указанные сценарии"
+    )
+    parser.add_argument("--output", help="Файл для результатов в JSON")
+    parser.add_argument("--compare", help="JSON предыдущего прогона для сравнения")
+    args = parser.parse_args()
+
+    setup_django()
+    # Ответы 4xx и 5xx учитываются в statuses, а не в журнале
+    logging.getLogger("django.request").setLevel(logging.CRITICAL)
+    from django.conf import settings
+    from django.contrib.auth.hashers import make_password
+    from django.core.cache import cache
+    from django.core.wsgi import get_wsgi_application
+
+    rng = random.Random(args.seed)
+    with benchmark_database() as connection:
+        started = time.perf_counter()
+        users = seed_dataset(
+            args.users,
+            max_fanout=args.max_fanout,
+            max_depth=args.max_depth,
+            seed=args.seed,
+            password_hash=make_password(PASSWORD),
+        )
+        seed_seconds = time.perf_counter() - started
+        application = get_wsgi_application()
+
+        results = []
+        for name, request, on_response in build_scenarios(users, rng, args):
+            if args.only and name not in args.only:
+                continue
+            cache.clear()
+            results.append(run_scenario(application, name, request, on_response, args))
+        cache.clear()
+
+        meta = {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "database": connection.vendor,
+            "database_version": ".".join(map(str, connection.get_database_version())),
+            "python": platform.python_version(),
+            "hash_workers": settings.PASSWORD_HASH_WORKERS,
+            "seed_seconds": seed_seconds,
+            "dataset": {
+                "users": args.users,
+                "with_mentor": sum(1 for user in users if user[1] is not None),
+                "max_depth": max((user[2] for user in users), default=0),
+            },
+            "args": vars(args),
+        }
+
+    print_results(results, args.output, meta=meta, columns=COLUMNS)
+    for result in results:
+        print(f"{result['name']}: статусы {result['statuses']}")
+    if args.compare:
+        compare_results(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
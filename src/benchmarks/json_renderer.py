@@ -0,0 +1,107 @@
+"""
+Микробенчмарк JSONRenderer/JSONParser DRF против ORJSONRenderer/ORJSONParser
+на данных реальных ответов: страница GET /users/ из 100 пользователей,
+профиль ментора и ошибка валидации с русскими сообщениями. Перед замером
+проверяется, что оба рендерера возвращают одинаковые байты.
+
+    python -m benchmarks.json_renderer --iterations 5000
+"""
+
+import argparse
+
+from .common import (
+    benchmark_database,
+    measure,
+    print_results,
+    seed_users,
+    setup_django,
+    summarize,
+)
+
+
+def build_payloads():
+    from rest_framework.test import APIRequestFactory
+
+    from api.serializers import (
+        RegistrationSerializer,
+        UserDetailSerializer,
+        UserListSerializer,
+    )
+    from api.views import user_detail_queryset, user_list_queryset
+
+    request = APIRequestFactory().get("/api/users/")
+    context = {"request": request}
+    users = UserListSerializer(
+        user_list_queryset()[:100], many=True, context=context
+    ).data
+    mentor = user_detail_queryset().filter(mentees__isnull=False).first()
+    errors = RegistrationSerializer(
+        data={
+            "username": users[0]["username"],
+            "password": "1",
+            "email": "почта",
+            "phone_number": "телефон",
+        }
+    )
+    errors.is_valid()
+    return {
+        "user list": {
+            "count": 100,
+            "next": "http://testserver/api/users/?limit=100&offset=100",
+            "previous": None,
+            "results": users,
+        },
+        "user detail": UserDetailSerializer(mentor, context=context).data,
+        "errors": errors.errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--output", help="Файл для результатов в JSON")
+    args = parser.parse_args()
+
+    setup_django()
+    import io
+
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+
+    from api.parsers import ORJSONParser
+    from api.renderers import ORJSONRenderer
+
+    with benchmark_database():
+        seed_users(args.users)
+        payloads = build_payloads()
+
+    renderers = {"json": JSONRenderer(), "orjson": ORJSONRenderer()}
+    parsers = {"json": JSONParser(), "orjson": ORJSONParser()}
+    results = []
+    for name, data in payloads.items():
+        rendered = {
+            backend: renderer.render(data) for backend, renderer in renderers.items()
+        }
+        assert rendered["json"] == rendered["orjson"], name
+        body = rendered["json"]
+        for backend in renderers:
+            renderer, json_parser = renderers[backend], parsers[backend]
+            latencies, elapsed = measure(lambda: renderer.render(data), args.iterations)
+            results.append(
+                summarize(
+                    f"{backend} render {name}", latencies, elapsed, size=len(body)
+                )
+            )
+            latencies, elapsed = measure(
+                lambda: json_parser.parse(io.BytesIO(body)), args.iterations
+            )
+            results.append(
+                summarize(f"{backend} parse {name}", latencies, elapsed, size=len(body))
+            )
+
+    print_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
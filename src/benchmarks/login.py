@@ -0,0 +1,143 @@
+"""
+Нагрузка на вход в систему и ее влияние на чтение API.
+
+Клиенты входа непрерывно вызывают POST /api/login/, клиенты чтения —
+GET /api/users/. Все запросы обслуживает ограниченное число потоков
+сервера (--threads), как gthread-воркер gunicorn. Сравниваются режимы:
+хэширование в потоке запроса и в ограниченном пуле процессов с 503 при
+переполнении очереди.
+
+    python -m benchmarks.login --duration 10 --login-clients 16 \
+        --read-clients 8 --threads 8 --hash-workers 2 --queue-size 4
+"""
+
+import argparse
+import json
+import logging
+import threading
+import time
+from unittest import mock
+
+from .common import (
+    benchmark_database,
+    print_results,
+    seed_users,
+    setup_django,
+    summarize,
+    wsgi_request,
+)
+
+
+def run_load(application, usernames, token, args):
+    server_threads = threading.Semaphore(args.threads)
+    deadline = time.perf_counter() + args.duration
+    stats = {"login": [], "read": []}
+    statuses = {"login": {}, "read": {}}
+    lock = threading.Lock()
+
+    def request(kind, method, path, body=b"", headers=None):
+        started = time.perf_counter()
+        with server_threads:
+            status = wsgi_request(application, method, path, body, headers)
+        elapsed = time.perf_counter() - started
+        with lock:
+            statuses[kind][status] = statuses[kind].get(status, 0) + 1
+            if status < 500:
+                stats[kind].append(elapsed)
+        return status
+
+    def login_client(index):
+        i = index
+        while time.perf_counter() < deadline:
+            body = json.dumps(
+                {"username": usernames[i % len(usernames)], "password": "benchmark"}
+            ).encode()
+            if request("login", "POST", "/api/login/", body) == 503:
+                # Клиент выдерживает паузу из Retry-After
+                time.sleep(args.retry_after)
+                continue
+            i += args.login_clients
+
+    def read_client(index):
+        headers = {"Authorization": f"Bearer {token}"}
+        while time.perf_counter() < deadline:
+            request("read", "GET", "/api/users/?limit=20", headers=headers)
+
+    clients = [
+        threading.Thread(target=login_client, args=(i,))
+        for i in range(args.login_clients)
+    ] + [
+        threading.Thread(target=read_client, args=(i,))
+        for i in range(args.read_clients)
+    ]
+    started = time.perf_counter()
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    return stats, statuses, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--login-clients", type=int, default=16)
+    parser.add_argument("--read-clients", type=int, default=8)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--hash-workers", type=int, default=2)
+    parser.add_argument("--queue-size", type=int, default=4)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--output", help="Файл для результатов в JSON")
+    args = parser.parse_args()
+
+    setup_django()
+    # Каждый ответ 503 иначе попадает в журнал django.request
+    logging.getLogger("django.request").setLevel(logging.CRITICAL)
+    from django.contrib.auth.hashers import make_password
+    from django.core.wsgi import get_wsgi_application
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from api import hashing
+
+    with benchmark_database():
+        users = seed_users(args.users, password_hash=make_password("benchmark"))
+        usernames = [user.username for user in users]
+        token = str(AccessToken.for_user(users[0]))
+        application = get_wsgi_application()
+
+        modes = {
+            # Пул не ограничивает хэширование сверх числа потоков сервера
+            "inline": hashing.HashingPool(0, args.threads),
+            "pool": hashing.HashingPool(args.hash_workers, args.queue_size),
+        }
+        results = []
+        for mode, pool in modes.items():
+            with mock.patch.object(hashing, "hashing_pool", pool):
+                # Прогрев: запуск процессов пула и первого входа
+                wsgi_request(
+                    application,
+                    "POST",
+                    "/api/login/",
+                    json.dumps(
+                        {"username": usernames[0], "password": "benchmark"}
+                    ).encode(),
+                )
+                stats, statuses, elapsed = run_load(application, usernames, token, args)
+            for kind in ("login", "read"):
+                results.append(
+                    summarize(
+                        f"{mode} {kind}",
+                        stats[kind],
+                        elapsed,
+                        statuses=statuses[kind],
+                    )
+                )
+
+    print_results(results, args.output)
+    for result in results:
+        print(f"{result['name']}: статусы {result['statuses']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Микробенчмарк сериализаторов чтения: обход полей DRF против функций
+compile_representation на странице GET /users/ из 100 пользователей
+(объекты моделей и строки .values()) и профиле ментора. Данные загружены
+заранее, замеряется только сериализация; перед замером проверяется,
+что представления совпадают.
+
+    python -m benchmarks.serializers --iterations 2000
+"""
+
+import argparse
+
+from .common import (
+    benchmark_database,
+    measure,
+    print_results,
+    seed_users,
+    setup_django,
+    summarize,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--output", help="Файл для результатов в JSON")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+
+    from api.serializers import UserDetailSerializer, UserListSerializer
+    from api.views import user_detail_queryset, user_list_queryset
+
+    User = get_user_model()
+
+    with benchmark_database():
+        seed_users(args.users)
+        instances = list(User.objects.with_is_mentor().order_by("id")[: args.page_size])
+        rows = list(user_list_queryset()[: args.page_size])
+        mentor = user_detail_queryset().get(pk=instances[0].pk)
+
+    def drf_list(users):
+        child = UserListSerializer(users, many=True).child
+        return [child.to_representation_fallback(user) for user in users]
+
+    def compiled_list(users):
+        return UserListSerializer(users, many=True).data
+
+    def drf_detail():
+        return UserDetailSerializer(mentor).to_representation_fallback(mentor)
+
+    def compiled_detail():
+        return UserDetailSerializer(mentor).data
+
+    cases = {
+        "list drf": lambda: drf_list(instances),
+        "list compiled": lambda: compiled_list(instances),
+        "list compiled rows": lambda: compiled_list(rows),
+        "detail drf": drf_detail,
+        "detail compiled": compiled_detail,
+    }
+    expected = drf_list(instances)
+    assert compiled_list(instances) == expected
+    assert compiled_list(rows) == expected
+    assert compiled_detail() == drf_detail()
+
+    results = []
+    for name, case in cases.items():
+        latencies, elapsed = measure(case, args.iterations)
+        results.append(summarize(name, latencies, elapsed))
+    print_results(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
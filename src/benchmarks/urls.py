@@ -0,0 +1,18 @@
+from django.urls import path
+
+from api.async_views import AsyncUserDetailView, AsyncUserListView, read_async
+from api.views import UserDetailView, UserListView
+
+# Синхронный и асинхронный стек на одном наборе данных
+urlpatterns = [
+    path("sync/users/", UserListView.as_view()),
+    path("sync/users/<int:pk>/", UserDetailView.as_view()),
+    path(
+        "async/users/",
+        read_async(AsyncUserListView.as_view(), UserListView.as_view()),
+    ),
+    path(
+        "async/users/<int:pk>/",
+        read_async(AsyncUserDetailView.as_view(), UserDetailView.as_view()),
+    ),
+]
@@ -14,3 +14,15 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
 
 application = get_asgi_application()
+
+
+def start_background_tasks():
+    # Фоновые задачи воркера импортируются после настройки Django
+    from api.last_login import start_last_login_flusher
+    from api.pruning import start_token_pruner
+
+    start_token_pruner()
+    start_last_login_flusher()
+
+
+start_background_tasks()
@@ -19,6 +19,94 @@ class Config(BaseSettings):
     DB_HOST: str
     DB_PORT: str
 
+    # Постоянные подключения: время жизни в секундах (0 — подключение
+    # на каждый запрос) и проверка подключения перед повторным использованием
+    DB_CONN_MAX_AGE: int = 0
+    DB_CONN_HEALTH_CHECKS: bool = True
+
+    # Пул подключений psycopg 3 (только PostgreSQL, вместо DB_CONN_MAX_AGE):
+    # размер пула на процесс, ожидание свободного подключения в секундах,
+    # закрытие лишних простаивающих и пересоздание старых подключений
+    DB_POOL: bool = False
+    DB_POOL_MIN_SIZE: int = 1
+    DB_POOL_MAX_SIZE: int = 4
+    DB_POOL_TIMEOUT: float = 10.0
+    DB_POOL_MAX_IDLE: float = 600.0
+    DB_POOL_MAX_LIFETIME: float = 3600.0
+
+    # Реплики для чтения: host или host:port через запятую (имя БД
+    # и учетные данные как у основной) и время, в течение которого чтение
+    # пользователя после записи идет в основную БД (больше задержки репликации)
+    DB_REPLICA_HOSTS: str = ""
+    DB_REPLICA_STICKY_SECONDS: int = 5
+    # Отдельный кэш для меток записи: вытеснение профилей их не затрагивает.
+    # Кэш должен быть общим для всех воркеров
+    DB_REPLICA_MARKER_CACHE_BACKEND: str = (
+        "django.core.cache.backends.filebased.FileBasedCache"
+    )
+    DB_REPLICA_MARKER_CACHE_LOCATION: str = "/tmp/mentor_api_replica_markers"
+
+    # Асинхронные представления чтения (запуск через core.asgi и uvicorn)
+    ASYNC_READ_VIEWS: bool = False
+
+    # Рендерер и парсер JSON на orjson (pip install mentor-api[fast-json])
+    FAST_JSON: bool = False
+
+    # Заголовок Server-Timing с числом и временем запросов к БД
+    SERVER_TIMING: bool = False
+
+    # Каталог метрик Prometheus, общий для процессов gunicorn
+    # (пусто — /metrics отдает метрики одного процесса)
+    PROMETHEUS_MULTIPROC_DIR: str = ""
+
+    # Кэш пользователей при JWT-аутентификации
+    AUTH_USER_CACHE_SIZE: int = 10000
+    AUTH_USER_CACHE_TTL: int = 60
+
+    # Фильтр Блума по черному списку refresh-токенов
+    BLACKLIST_FILTER_CAPACITY: int = 1000000
+    BLACKLIST_FILTER_ERROR_RATE: float = 0.001
+    BLACKLIST_FILTER_SYNC_INTERVAL: float = 1.0
+    BLACKLIST_FILTER_REBUILD_INTERVAL: float = 3600.0
+
+    # Очистка истекших токенов
+    TOKEN_PRUNE_BATCH_SIZE: int = 1000
+    TOKEN_PRUNE_PAUSE: float = 0.05
+    TOKEN_PRUNE_INTERVAL: int = 0
+
+    # Кэш Django (по умолчанию файловый, общий для воркеров на одном хосте;
+    # в docker-compose — Redis с вытеснением LRU). CACHE_MAX_ENTRIES
+    # ограничивает файловый и локальный кэш, Redis — maxmemory
+    CACHE_BACKEND: str = "django.core.cache.backends.filebased.FileBasedCache"
+    CACHE_LOCATION: str = "/tmp/mentor_api_cache"
+    CACHE_MAX_ENTRIES: int = 5000
+    USER_DETAIL_CACHE_TTL: int = 300
+
+    # Максимальная глубина обхода иерархии наставничества
+    HIERARCHY_MAX_DEPTH: int = 100
+
+    # Потоковая выгрузка пользователей: строк за одну выборку курсора
+    # и размер блока ответа в символах
+    USER_EXPORT_CHUNK_SIZE: int = 2000
+    USER_EXPORT_BUFFER_SIZE: int = 65536
+
+    # Синхронизация изменений пользователей: изменения моложе этого числа
+    # секунд не отдаются (их транзакции могут быть еще не завершены)
+    USER_CHANGES_SETTLE_SECONDS: float = 5.0
+
+    # Хэширование паролей: процессов в пуле на воркер (0 — в потоке запроса),
+    # предел задач в работе и очереди, ожидание места в очереди перед 503
+    # и число итераций PBKDF2 (0 — значение Django по умолчанию)
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_QUEUE_SIZE: int = 8
+    PASSWORD_HASH_QUEUE_TIMEOUT: float = 0.0
+    PASSWORD_HASH_ITERATIONS: int = 0
+
+    # Отложенная запись last_login: максимальная задержка в секундах
+    # (0 — запись при каждом входе) и размер буфера для досрочной записи
+    LAST_LOGIN_MAX_STALENESS: float = 0.0
+    LAST_LOGIN_BUFFER_SIZE: int = 10000
+
     # Настройки языка и времени
     LANGUAGE_CODE: str = "ru-ru"
     TIME_ZONE: str = "Europe/Moscow"
@@ -35,5 +123,11 @@ class Config(BaseSettings):
             return ["*"]
         return self.ALLOWED_HOSTS.split(",")
 
+    @property
+    def DB_REPLICA_HOSTS_LIST(self):
+        return [
+            host.strip() for host in self.DB_REPLICA_HOSTS.split(",") if host.strip()
+        ]
+
 
 config = Config()
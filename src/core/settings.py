@@ -1,8 +1,14 @@
+import os
 from datetime import timedelta
 from pathlib import Path
 
+from django.conf import global_settings
+
 from .config import config
 
+# Кэш в тестах переносится во временный каталог, см. core.test_runner
+TEST_RUNNER = "core.test_runner.TestRunner"
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = config.SECRET_KEY
@@ -16,6 +22,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "rest_framework_simplejwt",
     "rest_framework_simplejwt.token_blacklist",
@@ -24,8 +31,19 @@ INSTALLED_APPS = [
 ]
 
 REST_FRAMEWORK = {
-    "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+    "DEFAULT_AUTHENTICATION_CLASSES": ("api.authentication.CachedJWTAuthentication",),
+    "DEFAULT_RENDERER_CLASSES": (
+        "api.renderers.ORJSONRenderer"
+        if config.FAST_JSON
+        else "rest_framework.renderers.JSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "api.parsers.ORJSONParser"
+        if config.FAST_JSON
+        else "rest_framework.parsers.JSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
     ),
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
     "PAGE_SIZE": 100,
@@ -44,12 +62,38 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
     "ROTATE_REFRESH_TOKENS": True,
     "BLACKLIST_AFTER_ROTATION": True,
-    "UPDATE_LAST_LOGIN": True,
+    # При отложенной записи last_login обновляется через api.last_login
+    "UPDATE_LAST_LOGIN": not config.LAST_LOGIN_MAX_STALENESS,
     "AUTH_HEADER_TYPES": ("Bearer",),
     "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
+    "TOKEN_OBTAIN_SERIALIZER": "api.serializers.TokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "api.serializers.TokenRefreshSerializer",
+    "TOKEN_BLACKLIST_SERIALIZER": "api.serializers.TokenBlacklistSerializer",
 }
 
+BLACKLIST_FILTER_CAPACITY = config.BLACKLIST_FILTER_CAPACITY
+BLACKLIST_FILTER_ERROR_RATE = config.BLACKLIST_FILTER_ERROR_RATE
+BLACKLIST_FILTER_SYNC_INTERVAL = config.BLACKLIST_FILTER_SYNC_INTERVAL
+BLACKLIST_FILTER_REBUILD_INTERVAL = config.BLACKLIST_FILTER_REBUILD_INTERVAL
+
+TOKEN_PRUNE_BATCH_SIZE = config.TOKEN_PRUNE_BATCH_SIZE
+TOKEN_PRUNE_PAUSE = config.TOKEN_PRUNE_PAUSE
+TOKEN_PRUNE_INTERVAL = config.TOKEN_PRUNE_INTERVAL
+
+SERVER_TIMING = config.SERVER_TIMING
+
+# prometheus_client выбирает режим нескольких процессов по переменной
+# окружения при импорте, до создания метрик
+if config.PROMETHEUS_MULTIPROC_DIR:
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", config.PROMETHEUS_MULTIPROC_DIR)
+
+AUTH_USER_CACHE_SIZE = config.AUTH_USER_CACHE_SIZE
+AUTH_USER_CACHE_TTL = config.AUTH_USER_CACHE_TTL
+
 MIDDLEWARE = [
+    "api.middleware.MetricsMiddleware",
+    "api.middleware.QueryBudgetMiddleware",
+    "api.replicas.ReplicaMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -78,6 +122,9 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "core.wsgi.application"
+ASGI_APPLICATION = "core.asgi.application"
+
+ASYNC_READ_VIEWS = config.ASYNC_READ_VIEWS
 
 DATABASES = {
     "default": {
@@ -87,9 +134,90 @@ DATABASES = {
         "PASSWORD": config.DB_PASSWORD,
         "HOST": config.DB_HOST,
         "PORT": config.DB_PORT,
+        # Пул сам держит подключения, с CONN_MAX_AGE Django он несовместим
+        "CONN_MAX_AGE": 0 if config.DB_POOL else config.DB_CONN_MAX_AGE,
+        # С пулом проверка выполняется при выдаче подключения из пула
+        "CONN_HEALTH_CHECKS": config.DB_CONN_HEALTH_CHECKS,
+    }
+}
+
+if config.DB_POOL:
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": config.DB_POOL_MIN_SIZE,
+            "max_size": config.DB_POOL_MAX_SIZE,
+            "timeout": config.DB_POOL_TIMEOUT,
+            "max_idle": config.DB_POOL_MAX_IDLE,
+            "max_lifetime": config.DB_POOL_MAX_LIFETIME,
+        }
     }
+
+# Реплики для чтения: копии подключения default с другим адресом,
+# в тестах — зеркала default
+DATABASE_REPLICAS = []
+for number, address in enumerate(config.DB_REPLICA_HOSTS_LIST, start=1):
+    host, _, port = address.partition(":")
+    alias = f"replica{number}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "PORT": port or config.DB_PORT,
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+if DATABASE_REPLICAS:
+    DATABASE_ROUTERS = ["api.replicas.ReplicaRouter"]
+
+DB_REPLICA_STICKY_SECONDS = config.DB_REPLICA_STICKY_SECONDS
+
+REDIS_CACHE_BACKEND = "django.core.cache.backends.redis.RedisCache"
+
+
+def cache_settings(backend, location):
+    cache = {"BACKEND": backend, "LOCATION": location}
+    if backend != REDIS_CACHE_BACKEND:
+        # OPTIONS RedisCache передаются клиенту redis, поэтому только здесь.
+        # Файловый кэш читает каталог при каждой записи: держать в нем сотни
+        # тысяч записей слишком дорого, для большого кэша нужен Redis
+        cache["OPTIONS"] = {"MAX_ENTRIES": config.CACHE_MAX_ENTRIES}
+    return cache
+
+
+CACHES = {
+    "default": cache_settings(config.CACHE_BACKEND, config.CACHE_LOCATION),
+    # Метки записи для чтения из основной БД, см. api.replicas
+    "replica_markers": cache_settings(
+        config.DB_REPLICA_MARKER_CACHE_BACKEND,
+        config.DB_REPLICA_MARKER_CACHE_LOCATION,
+    ),
 }
 
+USER_DETAIL_CACHE_TTL = config.USER_DETAIL_CACHE_TTL
+
+HIERARCHY_MAX_DEPTH = config.HIERARCHY_MAX_DEPTH
+
+USER_EXPORT_CHUNK_SIZE = config.USER_EXPORT_CHUNK_SIZE
+USER_EXPORT_BUFFER_SIZE = config.USER_EXPORT_BUFFER_SIZE
+
+USER_CHANGES_SETTLE_SECONDS = config.USER_CHANGES_SETTLE_SECONDS
+
+LAST_LOGIN_MAX_STALENESS = config.LAST_LOGIN_MAX_STALENESS
+LAST_LOGIN_BUFFER_SIZE = config.LAST_LOGIN_BUFFER_SIZE
+
+PASSWORD_HASHERS = [
+    "api.hashing.PBKDF2PasswordHasher",
+    *(
+        hasher
+        for hasher in global_settings.PASSWORD_HASHERS
+        if hasher != "django.contrib.auth.hashers.PBKDF2PasswordHasher"
+    ),
+]
+PASSWORD_HASH_WORKERS = config.PASSWORD_HASH_WORKERS
+PASSWORD_HASH_QUEUE_SIZE = config.PASSWORD_HASH_QUEUE_SIZE
+PASSWORD_HASH_QUEUE_TIMEOUT = config.PASSWORD_HASH_QUEUE_TIMEOUT
+PASSWORD_HASH_ITERATIONS = config.PASSWORD_HASH_ITERATIONS
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -0,0 +1,32 @@
+from tempfile import TemporaryDirectory
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Запускает тесты с файловым кэшем во временном каталоге: cache.clear()
+    в тестах не должен очищать кэш запущенного на той же машине сервера.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._cache_dir = TemporaryDirectory(prefix="mentor_api_test_cache_")
+        self._cache_settings = override_settings(
+            CACHES={
+                alias: {
+                    "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                    "LOCATION": f"{self._cache_dir.name}/{alias}",
+                    "OPTIONS": {"MAX_ENTRIES": 100000},
+                }
+                for alias in settings.CACHES
+            }
+        )
+        self._cache_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._cache_settings.disable()
+        self._cache_dir.cleanup()
+        super().teardown_test_environment(**kwargs)